@@ -0,0 +1,38 @@
+"""对话历史内存基准：比较 list[Message] 与 CompactHistory 每条消息常驻的字节数"""
+
+import gc
+import tracemalloc
+
+from hello_agents import Message
+from my_history import CompactHistory
+
+TURNS = 2_000
+USER_TEXT = "请帮我分析一下这段代码的时间复杂度，并给出优化建议。"
+ASSISTANT_TEXT = "这段代码使用了两层嵌套循环，时间复杂度为 O(n^2)。可以使用哈希表把查找降到 O(1)，整体优化为 O(n)。" * 8
+
+
+def measure(history_factory, turns: int) -> float:
+    """模拟 add_message 写入 turns 轮对话（每轮两条消息），返回历史容器每条消息常驻的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = history_factory()
+    for i in range(turns):
+        history.append(Message(f"{USER_TEXT}#{i}", "user"))
+        history.append(Message(f"{ASSISTANT_TEXT}#{i}", "assistant"))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / (turns * 2)
+
+
+if __name__ == "__main__":
+    results = [
+        ("list[Message]（默认实现）", measure(list, TURNS)),
+        ("CompactHistory 不限容量", measure(lambda: CompactHistory(capacity=TURNS * 2), TURNS)),
+        ("CompactHistory 不限容量、压缩冷记录", measure(lambda: CompactHistory(capacity=TURNS * 2, compress_min_bytes=256), TURNS)),
+        ("CompactHistory 容量 100", measure(lambda: CompactHistory(capacity=100), TURNS)),
+    ]
+    print(f"写入 {TURNS} 轮对话后每条消息常驻内存：")
+    for name, per_message in results:
+        print(f"  {name:<32} {per_message:8.1f} bytes")
@@ -0,0 +1,41 @@
+"""冷启动基准：各模块的导入耗时（基于 python -X importtime）以及 MyLLM 构造/首次创建客户端耗时"""
+
+import subprocess
+import sys
+
+from test_import_time import ROOT, import_times
+
+MODULES = [
+    "my_calculator_tool",
+    "my_llm",
+    "my_simple_agent",
+    "my_react_agent",
+    "my_plan_solve_agent",
+    "my_reflection_agent",
+]
+
+LLM_INIT_SCRIPT = """
+import time
+start = time.perf_counter()
+from my_llm import MyLLM
+imported = time.perf_counter()
+llm = MyLLM(provider="modelscope", api_key="bench-key")
+constructed = time.perf_counter()
+llm._client
+ready = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(constructed - imported) * 1000:.1f} {(ready - constructed) * 1000:.1f}")
+"""
+
+
+if __name__ == "__main__":
+    print("模块导入耗时（累计）：")
+    for module in MODULES:
+        times = import_times(module)
+        heavy = [name for name in ("hello_agents", "openai") if name in times]
+        print(f"  {module:<22} {times[module] / 1000:8.1f} ms  重依赖: {', '.join(heavy) or '无'}")
+
+    output = subprocess.run(
+        [sys.executable, "-c", LLM_INIT_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    import_ms, init_ms, client_ms = output[-3:]
+    print(f"MyLLM 导入 {import_ms} ms，构造 {init_ms} ms，首次调用时创建客户端 {client_ms} ms")
@@ -0,0 +1,45 @@
+"""语义缓存查询延迟基准：python bench_semantic_cache.py [条目数,...]"""
+
+import sys
+import time
+
+import numpy as np
+
+from my_semantic_cache import SemanticAnswerCache
+
+
+def bench_lookup(size: int, dim: int = 256, queries: int = 200) -> None:
+    rng = np.random.default_rng(0)
+    cache = SemanticAnswerCache(dim=dim, capacity=size)
+
+    # 直接批量写入随机单位向量，避免向量化 100 万条文本拖慢准备阶段
+    batch = 100_000
+    for start in range(0, size, batch):
+        n = min(batch, size - start)
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        labels = [f"q{start + i}" for i in range(n)]
+        cache.put_vectors(vectors, labels, labels)
+
+    questions = [f"请帮我计算第 {i} 个问题的答案是多少" for i in range(queries)]
+    cache.get(questions[0])  # 预热
+
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        cache.get(question)
+        latencies.append(time.perf_counter() - start)
+
+    latencies_ms = np.array(latencies) * 1000
+    print(
+        f"条目数 {size:>9,}  维度 {dim}  "
+        f"p50 {np.percentile(latencies_ms, 50):.2f} ms  "
+        f"p99 {np.percentile(latencies_ms, 99):.2f} ms  "
+        f"矩阵 {cache._vectors.nbytes / 1024 / 1024:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100_000, 1_000_000]
+    for size in sizes:
+        bench_lookup(size)
@@ -0,0 +1,51 @@
+"""服务压测：python bench_server.py [并发用户数] [每用户请求数] [agent类型]
+
+在进程内启动使用 StubLLM 的服务，N 个用户各自使用独立会话连续发送请求，
+报告吞吐、p50/p99 延迟与 429 拒绝数。
+"""
+
+import asyncio
+import sys
+import time
+
+from my_server import AgentServer, LLMPool, StubLLM
+from test_server import http_request
+
+
+async def user(port: int, user_id: int, requests: int, agent_type: str, latencies: list, statuses: list) -> None:
+    for i in range(requests):
+        start = time.perf_counter()
+        status, _ = await http_request(port, "POST", f"/v1/agents/{agent_type}/run", {"session_id": f"user-{user_id}", "input": f"问题{i}"})
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+
+
+async def bench(users: int, requests: int, agent_type: str, stub_latency: float = 0.05) -> None:
+    server = AgentServer(LLMPool(lambda _: StubLLM(stub_latency)), max_inflight=32, max_queue=256)
+    http_server = await server.start("127.0.0.1", 0)
+    port = http_server.sockets[0].getsockname()[1]
+
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[user(port, u, requests, agent_type, latencies, statuses) for u in range(users)])
+    elapsed = time.perf_counter() - start
+
+    http_server.close()
+    await http_server.wait_closed()
+    server.close()
+
+    ok = sorted(latency for latency, status in zip(latencies, statuses) if status == 200)
+    p50 = ok[int(0.50 * (len(ok) - 1))] * 1000 if ok else 0.0
+    p99 = ok[int(0.99 * (len(ok) - 1))] * 1000 if ok else 0.0
+    print(
+        f"{agent_type}: {users} 并发用户 x {requests} 请求，桩LLM延迟 {stub_latency * 1000:.0f} ms\n"
+        f"  吞吐 {len(statuses) / elapsed:.1f} req/s  成功 {len(ok)}  429 {statuses.count(429)}\n"
+        f"  p50 {p50:.1f} ms  p99 {p99:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    agent_type = sys.argv[3] if len(sys.argv) > 3 else "simple"
+    asyncio.run(bench(users, requests, agent_type))
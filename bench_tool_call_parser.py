@@ -0,0 +1,49 @@
+"""工具调用解析微基准：在包含大量工具调用的长响应上比较旧实现与单遍扫描器"""
+
+import re
+import timeit
+
+from my_tool_call_parser import parse_tool_calls, strip_tool_calls
+
+
+def legacy_parse_and_strip(text: str) -> str:
+    """旧版 MySimpleAgent 的实现：每次编译正则，逐个 str.replace 移除调用"""
+    pattern = r"\[TOOL_CALL:([^:]+):([^\]]+)\]"
+    matches = re.findall(pattern, text)
+    tool_calls = []
+    for tool_name, parameters in matches:
+        tool_calls.append({
+            'tool_name': tool_name,
+            'parameters': parameters,
+            'original': f'[TOOL_CALL:{tool_name}:{parameters}]'
+        })
+    clean_response = text
+    for call in tool_calls:
+        clean_response = clean_response.replace(call['original'], "")
+    return clean_response
+
+
+def single_pass_parse_and_strip(text: str) -> str:
+    return strip_tool_calls(text, parse_tool_calls(text))
+
+
+def build_response(calls: int) -> str:
+    filler = "根据你的问题，我需要先查询一些资料，然后再进行计算。" * 4
+    return "".join(
+        f"{filler}[TOOL_CALL:search:query=第{i}个问题, limit=5]\n"
+        for i in range(calls)
+    )
+
+
+if __name__ == "__main__":
+    for calls in (10, 100, 1000):
+        text = build_response(calls)
+        assert legacy_parse_and_strip(text) == single_pass_parse_and_strip(text)
+        number = max(1, 2000 // calls)
+        legacy = timeit.timeit(lambda: legacy_parse_and_strip(text), number=number) / number
+        single = timeit.timeit(lambda: single_pass_parse_and_strip(text), number=number) / number
+        print(
+            f"{calls:>5} 个调用 / {len(text):>7} 字符  "
+            f"旧实现 {legacy * 1000:8.3f} ms  单遍扫描 {single * 1000:8.3f} ms  "
+            f"加速 {legacy / single:5.1f}x"
+        )
@@ -0,0 +1,53 @@
+"""测试用的离线LLM"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, Union
+
+# 预设回复：字符串原样返回，异常实例在调用时抛出，函数以 messages 为参数生成回复
+Response = Union[str, Exception, Callable[[list], str]]
+
+
+class ScriptedLLM:
+    """
+    按调用顺序返回预设回复的离线LLM，用完后重复最后一条
+
+    - calls 为 invoke 次数，stream_calls 为 stream_invoke 次数
+    - requests 按顺序记录每次 invoke 的最后一条消息内容与调用参数
+    - 每次调用休眠 latency 秒模拟网络等待，流式调用把等待时间分摊到各个片段
+    """
+
+    def __init__(self, responses: Sequence[Response] = ("stub answer",), model: str = "stub", latency: float = 0.0):
+        self.provider = "stub"
+        self.model = model
+        self.responses = list(responses)
+        self.latency = latency
+        self.calls = 0
+        self.stream_calls = 0
+        self.requests: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def _respond(self, messages: list[dict[str, str]], index: int) -> str:
+        response = self.responses[min(index, len(self.responses) - 1)]
+        if isinstance(response, Exception):
+            raise response
+        if callable(response):
+            return response(messages)
+        return response
+
+    def invoke(self, messages: list[dict[str, str]], **kwargs) -> str:
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+            self.requests.append((messages[-1]["content"] if messages else "", kwargs))
+        time.sleep(self.latency)
+        return self._respond(messages, index)
+
+    def stream_invoke(self, messages: list[dict[str, str]], **kwargs) -> Iterator[str]:
+        with self._lock:
+            index = self.stream_calls
+            self.stream_calls += 1
+        text = self._respond(messages, index)
+        for char in text:
+            time.sleep(self.latency / max(len(text), 1))
+            yield char
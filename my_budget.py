@@ -0,0 +1,94 @@
+"""运行预算 - 限制单次运行的 token、耗时与 LLM 调用次数，超出预算时提前停止并返回当前最佳结果"""
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# 中日韩字符与全角符号，大多数分词器中约为 1 个 token
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 个计，其余字符按每 4 个字符 1 个计"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class RunBudget:
+    """单次运行的预算，None 表示不限制"""
+    max_tokens: Optional[int] = None
+    max_wall_time: Optional[float] = None
+    max_llm_calls: Optional[int] = None
+
+
+class BudgetTracker:
+    """
+    记录一次运行的花费并判断预算是否用尽
+
+    LLM 只返回文本，token 数按 estimate_tokens 估算（提示词与回复分别计数）。
+    CascadeLLM 升级时一次 invoke 对应两次上游调用，按 last_upstream_responses 分别计数。
+    """
+
+    def __init__(self, budget: Optional[RunBudget] = None):
+        self.budget = budget or RunBudget()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.stop_reason: Optional[str] = None
+        self._start = time.perf_counter()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def wall_time(self) -> float:
+        return time.perf_counter() - self._start
+
+    def invoke(self, llm, messages: list[dict[str, str]], **kwargs) -> str:
+        """通过 llm.invoke 调用并记录花费"""
+        response = llm.invoke(messages, **kwargs)
+        responses = getattr(llm, "last_upstream_responses", None) or [response]
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        self.llm_calls += len(responses)
+        self.prompt_tokens += prompt_tokens * len(responses)
+        self.completion_tokens += sum(estimate_tokens(text or "") for text in responses)
+        return response
+
+    def exhausted(self) -> bool:
+        """
+        预算是否已用尽
+
+        尚未调用过LLM时总是返回 False，保证每次运行至少有一个结果可以返回。
+        """
+        if self.stop_reason:
+            return True
+        if not self.llm_calls:
+            return False
+
+        budget = self.budget
+        if budget.max_llm_calls is not None and self.llm_calls >= budget.max_llm_calls:
+            self.stop_reason = "max_llm_calls"
+        elif budget.max_tokens is not None and self.total_tokens >= budget.max_tokens:
+            self.stop_reason = "max_tokens"
+        elif budget.max_wall_time is not None and self.wall_time >= budget.max_wall_time:
+            self.stop_reason = "max_wall_time"
+        else:
+            return False
+        print(f"⏱️ 运行预算已用尽（{self.stop_reason}），提前停止")
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """本次运行的花费，写入结果消息的 metadata["budget"]"""
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "wall_time": round(self.wall_time, 4),
+            "stop_reason": self.stop_reason,
+        }
@@ -1,8 +1,6 @@
 import ast
 import operator
 import math
-from shutil import RegistryError
-from hello_agents import ToolRegistry
 
 def my_calculate(expression: str) -> str:
     """简单的数学计算函数"""
@@ -62,7 +60,9 @@ def _eval_node(node, operators, functions):
 
 def create_calculator_registry():
     """创建包含计算器的工作注册表"""
-    tool_registry = ToolRegistry()
+    # 延迟导入：hello_agents 会连带导入 openai，只使用 my_calculate 时无需付出这部分启动开销
+    from my_tool_registry import VersionedToolRegistry
+    tool_registry = VersionedToolRegistry()
 
     # 注册计算器函数
     tool_registry.register_function(
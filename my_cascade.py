@@ -0,0 +1,169 @@
+"""模型级联 - 小模型优先回答，解析失败或置信度不足时升级到大模型"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from hello_agents import HelloAgentsLLM
+
+# 小模型输出中出现这些表述时视为置信度不足
+DEFAULT_UNCERTAINTY_MARKERS = [
+    "我不确定",
+    "无法确定",
+    "无法回答",
+    "i'm not sure",
+    "i am not sure",
+    "cannot determine",
+]
+
+
+class CascadeLLM:
+    """
+    级联LLM
+
+    与 HelloAgentsLLM 接口一致，可以直接作为某个角色（planner、reflect 等）的 llm 使用。
+    每次 invoke 先调用小模型，出现以下情况时升级到大模型：
+    1. 小模型调用抛出异常
+    2. 输出为空或短于 min_length
+    3. validator 返回 False（例如计划无法解析）
+    4. 输出包含不确定性表述
+
+    流式调用无法在输出前校验，直接使用大模型。
+    """
+
+    def __init__(
+        self,
+        small_llm: HelloAgentsLLM,
+        large_llm: HelloAgentsLLM,
+        role: str = "default",
+        validator: Optional[Callable[[str], bool]] = None,
+        min_length: int = 1,
+        uncertainty_markers: Optional[List[str]] = None
+    ):
+        self.small_llm = small_llm
+        self.large_llm = large_llm
+        self.role = role
+        self.validator = validator
+        self.min_length = min_length
+        markers = uncertainty_markers if uncertainty_markers is not None else DEFAULT_UNCERTAINTY_MARKERS
+        self.uncertainty_markers = [m.lower() for m in markers]
+
+        # 与 HelloAgentsLLM 保持一致的属性
+        self.provider = getattr(large_llm, "provider", None)
+        self.model = f"{getattr(small_llm, 'model', None)} -> {getattr(large_llm, 'model', None)}"
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset_stats()
+
+    def invoke(self, messages: list[dict[str, str]], validator: Optional[Callable[[str], bool]] = None, **kwargs) -> str:
+        """
+        级联调用
+
+        Args:
+            messages: 消息列表
+            validator: 本次调用的输出校验函数，优先于初始化时的 validator
+            **kwargs: LLM调用参数
+        """
+        validator = validator or self.validator
+        responses = self._local.responses = []
+
+        start = time.perf_counter()
+        try:
+            response_text = self.small_llm.invoke(messages, **kwargs) or ""
+            reason = self._escalation_reason(response_text, validator)
+        except Exception as e:
+            print(f"⚠️ [{self.role}] 小模型调用失败：{e}")
+            response_text = ""
+            reason = "error"
+        small_latency = time.perf_counter() - start
+        responses.append(response_text)
+
+        if reason is None:
+            self._record(small_latency, None, None)
+            return response_text
+
+        print(f"⬆️ [{self.role}] 升级到大模型，原因：{reason}")
+        start = time.perf_counter()
+        try:
+            response_text = self.large_llm.invoke(messages, **kwargs)
+            responses.append(response_text)
+        finally:
+            self._record(small_latency, time.perf_counter() - start, reason)
+        return response_text
+
+    @property
+    def last_upstream_responses(self) -> List[str]:
+        """
+        当前线程最近一次 invoke 中每次上游调用的输出，小模型在前
+
+        升级时包含两项，BudgetTracker 据此统计实际的调用次数与 token 数。
+        """
+        return getattr(self._local, "responses", [])
+
+    def think(self, messages: list[dict[str, str]], temperature: Optional[float] = None) -> Iterator[str]:
+        """流式调用，直接使用大模型"""
+        yield from self.large_llm.think(messages, temperature)
+
+    def stream_invoke(self, messages: list[dict[str, str]], **kwargs) -> Iterator[str]:
+        """流式调用，直接使用大模型"""
+        yield from self.large_llm.stream_invoke(messages, **kwargs)
+
+    def _escalation_reason(self, response_text: str, validator: Optional[Callable[[str], bool]]) -> Optional[str]:
+        """判断是否需要升级，返回升级原因，不需要升级时返回 None"""
+        if len(response_text.strip()) < self.min_length:
+            return "empty"
+        if validator and not validator(response_text):
+            return "invalid"
+        lowered = response_text.lower()
+        if any(marker in lowered for marker in self.uncertainty_markers):
+            return "uncertain"
+        return None
+
+    def _record(self, small_latency: float, large_latency: Optional[float], reason: Optional[str]) -> None:
+        with self._lock:
+            stats = self._stats
+            stats["calls"] += 1
+            stats["small_latency_total"] += small_latency
+            if reason is not None:
+                stats["escalations"] += 1
+                stats["escalation_reasons"][reason] = stats["escalation_reasons"].get(reason, 0) + 1
+                stats["large_latency_total"] += large_latency or 0.0
+
+    def reset_stats(self) -> None:
+        """清空统计数据"""
+        with self._lock:
+            self._stats = {
+                "calls": 0,
+                "escalations": 0,
+                "escalation_reasons": {},
+                "small_latency_total": 0.0,
+                "large_latency_total": 0.0,
+            }
+
+    def get_stats(self) -> Dict[str, object]:
+        """
+        获取级联统计
+
+        Returns:
+            调用次数、升级次数、升级率、升级原因分布、平均延迟（秒）
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["escalation_reasons"] = dict(stats["escalation_reasons"])
+        calls = stats["calls"]
+        escalations = stats["escalations"]
+        stats["role"] = self.role
+        stats["escalation_rate"] = escalations / calls if calls else 0.0
+        stats["avg_small_latency"] = stats["small_latency_total"] / calls if calls else 0.0
+        stats["avg_large_latency"] = stats["large_latency_total"] / escalations if escalations else 0.0
+        stats["avg_latency"] = (stats["small_latency_total"] + stats["large_latency_total"]) / calls if calls else 0.0
+        return stats
+
+
+def collect_role_stats(role_llms: Dict[str, HelloAgentsLLM]) -> Dict[str, Dict[str, object]]:
+    """汇总各角色中级联LLM的统计数据"""
+    return {
+        role: llm.get_stats()
+        for role, llm in role_llms.items()
+        if isinstance(llm, CascadeLLM)
+    }
@@ -0,0 +1,137 @@
+"""录制/回放 - 把LLM请求与响应写入追加式 cassette 文件，离线确定性地重放"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from hello_agents import HelloAgentsException
+from my_singleflight import canonical_key
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class Cassette:
+    """
+    LLM 交互录制文件
+
+    每次交互追加一行 JSON：请求键、请求内容、响应以及耗时；
+    流式响应记录每个片段相对请求开始的时间偏移（秒）。
+    回放时按请求键查找，同一请求出现多次时按录制顺序依次返回，用完后重复最后一条。
+    请求键只包含消息与调用参数，不包含模型名，回放时无需与录制时解析出相同的模型。
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, realtime: bool = False):
+        """
+        Args:
+            path: cassette 文件路径
+            mode: "record" 追加录制，"replay" 回放
+            realtime: 回放时是否按录制时的耗时等待，False 则全速回放
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"未知的 cassette 模式：{mode}")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+
+        if mode == REPLAY:
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """根据环境变量 LLM_CASSETTE / LLM_CASSETTE_MODE / LLM_CASSETTE_REALTIME 创建"""
+        path = os.getenv("LLM_CASSETTE")
+        if not path:
+            return None
+        return cls(
+            path,
+            mode=os.getenv("LLM_CASSETTE_MODE", REPLAY),
+            realtime=os.getenv("LLM_CASSETTE_REALTIME", "false").lower() == "true"
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @staticmethod
+    def _key(kind: str, messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        return canonical_key(kind, messages, kwargs)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"cassette 文件不存在：{self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 录制中断留下的半行，跳过
+                    continue
+                self._entries[entry["key"]].append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab+") as f:
+                # 上次录制中断时文件末尾是不完整的一行，先补上换行，避免新记录与它粘在一起
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+
+    def _next(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._entries.get(key)
+            if queue:
+                entry = self._last[key] = queue.popleft()
+                return entry
+            if key in self._last:
+                return self._last[key]
+        raise HelloAgentsException(f"cassette 中没有匹配的请求：{key[:12]}")
+
+    # ---- 录制 ----
+
+    def record_invoke(self, model: Optional[str], messages: list[dict[str, str]], kwargs: Dict[str, Any], response: str, elapsed: float) -> None:
+        self._append({
+            "key": self._key("invoke", messages, kwargs),
+            "type": "invoke",
+            "model": model,
+            "messages": messages,
+            "kwargs": kwargs,
+            "response": response,
+            "elapsed": round(elapsed, 4),
+        })
+
+    def record_stream(self, model: Optional[str], messages: list[dict[str, str]], kwargs: Dict[str, Any], chunks: List[list]) -> None:
+        self._append({
+            "key": self._key("stream", messages, kwargs),
+            "type": "stream",
+            "model": model,
+            "messages": messages,
+            "kwargs": kwargs,
+            "chunks": chunks,
+        })
+
+    # ---- 回放 ----
+
+    def replay_invoke(self, messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        entry = self._next(self._key("invoke", messages, kwargs))
+        if self.realtime:
+            time.sleep(entry["elapsed"])
+        return entry["response"]
+
+    def replay_stream(self, messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> Iterator[str]:
+        entry = self._next(self._key("stream", messages, kwargs))
+        start = time.perf_counter()
+        for offset, chunk in entry["chunks"]:
+            if self.realtime:
+                delay = offset - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield chunk
@@ -0,0 +1,106 @@
+"""运行检查点 - 支持 Plan-and-Solve / ReAct 运行的断点续跑"""
+
+import json
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+
+class CheckpointStore:
+    """
+    本地检查点存储
+
+    每个 run_id 对应目录下的一个 JSONL 文件，每完成一步只追加一行记录，
+    不重写已有内容，因此写入开销与单步结果大小成正比，可以在生产环境常开。
+
+    记录类型：
+    - start: 运行开始，记录 agent 类型与输入
+    - plan: Plan-and-Solve 生成的计划
+    - step: Plan-and-Solve 完成的一个步骤及其结果
+    - react_step: ReAct 完成的一步及本步新增的历史行
+    - finish: 运行结束及最终答案
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, fsync: bool = False):
+        """
+        Args:
+            root_dir: 检查点目录，默认读取环境变量 AGENT_CHECKPOINT_DIR，否则为 .checkpoints
+            fsync: 是否每次写入后 fsync，开启后更耐掉电但写入更慢
+        """
+        self.root_dir = root_dir or os.getenv("AGENT_CHECKPOINT_DIR", ".checkpoints")
+        self.fsync = fsync
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def new_run_id(self) -> str:
+        """生成新的 run_id"""
+        return uuid.uuid4().hex
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.root_dir, f"{run_id}.jsonl")
+
+    def exists(self, run_id: str) -> bool:
+        """检查 run_id 是否有检查点"""
+        return os.path.exists(self._path(run_id))
+
+    def append(self, run_id: str, record: Dict[str, Any]) -> None:
+        """追加一条检查点记录"""
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self._path(run_id), "ab+") as f:
+            # 上次写入中断时文件末尾是不完整的一行，先补上换行，避免新记录与它粘在一起
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self, run_id: str) -> Dict[str, Any]:
+        """
+        回放检查点记录，恢复运行状态
+
+        Returns:
+            状态字典：agent, input, plan, results, history, react_step, finished, answer
+        """
+        if not self.exists(run_id):
+            raise KeyError(f"未找到运行检查点：{run_id}")
+
+        state: Dict[str, Any] = {
+            "run_id": run_id,
+            "agent": None,
+            "input": None,
+            "plan": None,
+            "results": [],
+            "history": [],
+            "react_step": 0,
+            "finished": False,
+            "answer": None,
+        }
+        with open(self._path(run_id), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程在写入中途退出时会留下不完整的一行，跳过即可
+                    continue
+                kind = record.get("type")
+                if kind == "start":
+                    state["agent"] = record.get("agent")
+                    state["input"] = record.get("input")
+                elif kind == "plan":
+                    state["plan"] = record["plan"]
+                elif kind == "step":
+                    state["results"].append(record["result"])
+                elif kind == "react_step":
+                    state["react_step"] = record["step"]
+                    state["history"].extend(record.get("lines", []))
+                elif kind == "finish":
+                    state["finished"] = True
+                    state["answer"] = record.get("answer")
+        return state
+
+    def delete(self, run_id: str) -> None:
+        """删除检查点"""
+        if self.exists(run_id):
+            os.remove(self._path(run_id))
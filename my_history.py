@@ -0,0 +1,122 @@
+"""紧凑对话历史 - 固定容量环形缓冲区，替代 Agent 默认的 list[Message]"""
+
+import sys
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from hello_agents import Message
+
+
+class TurnRecord:
+    """
+    单条历史记录
+
+    使用 __slots__ 避免每条记录携带 __dict__，角色字符串经过 intern 共享，
+    时间戳保存为 float，较长的冷数据内容以 zlib 压缩后的 bytes 保存。
+    对外提供与 Message 相同的 role / content 属性。
+    """
+
+    __slots__ = ("role", "_content", "timestamp", "metadata")
+
+    def __init__(self, role: str, content: str, timestamp: float, metadata: Optional[Dict[str, Any]] = None):
+        self.role = sys.intern(role)
+        self._content = content
+        self.timestamp = timestamp
+        self.metadata = metadata or None
+
+    @property
+    def content(self) -> str:
+        content = self._content
+        if isinstance(content, bytes):
+            return zlib.decompress(content).decode("utf-8")
+        return content
+
+    @property
+    def compressed(self) -> bool:
+        return isinstance(self._content, bytes)
+
+    def compress(self, min_bytes: int) -> None:
+        """内容不短于 min_bytes 且压缩后更小时压缩"""
+        content = self._content
+        if isinstance(content, bytes):
+            return
+        raw = content.encode("utf-8")
+        if len(raw) < min_bytes:
+            return
+        packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            self._content = packed
+
+    def to_message(self) -> Message:
+        """还原为 Message 对象"""
+        return Message(
+            self.content,
+            self.role,
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            metadata=self.metadata or {}
+        )
+
+    def __repr__(self) -> str:
+        return f"TurnRecord(role={self.role!r}, compressed={self.compressed})"
+
+
+class CompactHistory:
+    """
+    紧凑对话历史
+
+    可以直接赋值给 Agent._history：Agent 的 add_message / get_history / clear_history
+    分别调用 append / copy / clear，迭代时返回带 role 和 content 属性的 TurnRecord。
+    - 容量固定，超出后覆盖最旧的记录，长期运行的会话内存有上界
+    - 可选压缩：指定 compress_min_bytes 时，最近 hot_turns 条保持明文，更早的记录在超过
+      compress_min_bytes 时压缩。默认不压缩，因为 Agent 每轮都会遍历完整历史，
+      压缩的冷记录每轮都要解压一次，用CPU换内存
+    """
+
+    def __init__(self, capacity: int = 100, hot_turns: int = 8, compress_min_bytes: Optional[int] = None):
+        if capacity <= 0:
+            raise ValueError("capacity 必须为正数")
+        self.capacity = capacity
+        self.hot_turns = hot_turns
+        self.compress_min_bytes = compress_min_bytes
+        self._buffer: List[Optional[TurnRecord]] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def append(self, message: Message) -> None:
+        """追加一条消息，缓冲区满时覆盖最旧的记录"""
+        timestamp = message.timestamp.timestamp() if message.timestamp else datetime.now().timestamp()
+        record = TurnRecord(message.role, message.content, timestamp, message.metadata)
+
+        if self._size < self.capacity:
+            self._buffer[(self._start + self._size) % self.capacity] = record
+            self._size += 1
+        else:
+            self._buffer[self._start] = record
+            self._start = (self._start + 1) % self.capacity
+
+        # 刚刚离开热区的记录转为冷数据
+        if self.compress_min_bytes is not None and self._size > self.hot_turns:
+            self[self._size - self.hot_turns - 1].compress(self.compress_min_bytes)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> TurnRecord:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return self._buffer[(self._start + index) % self.capacity]
+
+    def __iter__(self) -> Iterator[TurnRecord]:
+        for i in range(self._size):
+            yield self._buffer[(self._start + i) % self.capacity]
+
+    def copy(self) -> List[Message]:
+        """返回 Message 列表，与默认 get_history 的返回值一致"""
+        return [record.to_message() for record in self]
+
+    def clear(self) -> None:
+        self._buffer = [None] * self.capacity
+        self._start = 0
+        self._size = 0
@@ -1,17 +1,38 @@
 import os
-from typing import Optional
+import threading
+import time
+from typing import Iterator, Optional
 from hello_agents import HelloAgentsLLM
-from openai import OpenAI
+from my_cassette import Cassette
 
 class MyLLM(HelloAgentsLLM):
+    """
+    自定义LLM，支持 ModelScope Provider
+
+    OpenAI 客户端在首次调用LLM时才创建，构造 MyLLM 本身不会建立连接池，
+    适合启动后可能只处理少量请求的短生命周期进程。
+
+    传入 cassette（或设置环境变量 LLM_CASSETTE）后可以录制所有请求与响应，
+    回放模式下不访问网络，也不需要真实的API密钥。
+    """
+
+    _client_lock = threading.Lock()
+
     def __init__(
         self,
         model: Optional[str] = None,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         provider: Optional[str] = "auto",
+        cassette: Optional[Cassette] = None,
         **kwargs
     ):
+        self.cassette = cassette or Cassette.from_env()
+        if self.cassette and self.cassette.replaying:
+            # 回放不访问网络，缺少的凭证用占位值补齐
+            api_key = api_key or "cassette-replay"
+            base_url = base_url or "http://cassette.invalid/v1"
+
         if provider == 'modelscope':
             print("正在使用自定义的 ModelScope Provider")
             self.provider = provider
@@ -28,9 +49,58 @@ class MyLLM(HelloAgentsLLM):
             self.max_tokens = kwargs.get('max_tokens')
             self.timeout = kwargs.get('timeout', 60)
 
-            # 使用获取的参数创建OpenAI客户端实例
-            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout)
+            # OpenAI客户端延迟到首次调用时创建
+            self._client = None
 
         else:
             # 如果不是 modelscope, 则完全使用父类的原始逻辑来处理
             super().__init__(model=model, api_key=api_key, base_url=base_url, provider=provider, **kwargs)
+
+    @property
+    def _client(self):
+        """OpenAI客户端，首次访问时创建"""
+        client = self.__dict__.get("_lazy_client")
+        if client is None:
+            with self._client_lock:
+                client = self.__dict__.get("_lazy_client")
+                if client is None:
+                    client = super()._create_client()
+                    self.__dict__["_lazy_client"] = client
+        return client
+
+    @_client.setter
+    def _client(self, client):
+        self.__dict__["_lazy_client"] = client
+
+    def _create_client(self):
+        """父类初始化时会立即调用该方法，这里返回 None，推迟到首次访问 _client 时再创建"""
+        return None
+
+    def invoke(self, messages: list[dict[str, str]], **kwargs) -> str:
+        """非流式调用，配置了 cassette 时录制或回放"""
+        if self.cassette is None:
+            return super().invoke(messages, **kwargs)
+        if self.cassette.replaying:
+            return self.cassette.replay_invoke(messages, kwargs)
+
+        start = time.perf_counter()
+        response = super().invoke(messages, **kwargs)
+        self.cassette.record_invoke(self.model, messages, kwargs, response, time.perf_counter() - start)
+        return response
+
+    def think(self, messages: list[dict[str, str]], temperature: Optional[float] = None) -> Iterator[str]:
+        """流式调用（stream_invoke 也经过这里），配置了 cassette 时录制每个片段及其时间偏移"""
+        if self.cassette is None:
+            yield from super().think(messages, temperature)
+            return
+        kwargs = {"temperature": temperature}
+        if self.cassette.replaying:
+            yield from self.cassette.replay_stream(messages, kwargs)
+            return
+
+        chunks = []
+        start = time.perf_counter()
+        for chunk in super().think(messages, temperature):
+            chunks.append([round(time.perf_counter() - start, 4), chunk])
+            yield chunk
+        self.cassette.record_stream(self.model, messages, kwargs, chunks)
@@ -1,8 +1,12 @@
 # 默认规划器提示词模板
 import ast
-from typing import List, Optional, Dict
-from urllib import response
+from typing import Callable, List, Optional, Dict
 from hello_agents import HelloAgentsLLM, Message, PlanAndSolveAgent, Config
+from my_budget import BudgetTracker, RunBudget
+from my_cascade import CascadeLLM, collect_role_stats
+from my_checkpoint import CheckpointStore
+from my_history import CompactHistory
+from my_profiler import profiled
 
 
 DEFAULT_PLANNER_PROMPT = """
@@ -52,12 +56,13 @@ class Planner:
         self.llm = llm
         self.prompt_template = prompt_template if prompt_template else DEFAULT_PLANNER_PROMPT
     
-    def plan(self, input_text: str, **kwargs) -> List[str]:
+    def plan(self, input_text: str, tracker: Optional[BudgetTracker] = None, **kwargs) -> List[str]:
         """
         生成执行计划
 
         Args:
             question: 要解决的问题
+            tracker: 本次运行的预算记录
             **kwargs: LLM调用参数
 
         Returns:
@@ -67,9 +72,17 @@ class Planner:
         messages = [{"role": "user", "content": prompt}]
 
         print("--- 正在生成计划 ---\n")
-        response_text = self.llm.invoke(messages, **kwargs) or ""
+        if isinstance(self.llm, CascadeLLM):
+            # 级联模式下，小模型输出的计划无法解析时升级到大模型
+            kwargs["validator"] = lambda text: bool(self._parse_plan(text, verbose=False))
+        tracker = tracker or BudgetTracker()
+        response_text = tracker.invoke(self.llm, messages, **kwargs) or ""
         print(f"计划已生成：\n{response_text}")
 
+        return self._parse_plan(response_text)
+
+    def _parse_plan(self, response_text: str, verbose: bool = True) -> List[str]:
+        """从LLM响应中解析步骤列表，解析失败时返回空列表"""
         try:
             plan_str = None
             
@@ -96,15 +109,18 @@ class Planner:
                 plan = ast.literal_eval(plan_str)
                 return plan if isinstance(plan, list) else []
             else:
-                print(f"❌ 无法在响应中找到列表格式")
+                if verbose:
+                    print(f"❌ 无法在响应中找到列表格式")
                 return []
                 
         except (ValueError, SyntaxError, IndexError) as e:
-            print(f"❌ 解析计划时出错：{e}")
-            print(f"原始响应：{response_text}")
+            if verbose:
+                print(f"❌ 解析计划时出错：{e}")
+                print(f"原始响应：{response_text}")
             return []
         except Exception as e:  
-            print(f"❌ 解析计划时发生未知错误: {e}")
+            if verbose:
+                print(f"❌ 解析计划时发生未知错误: {e}")
             return []
 
 class Executor:
@@ -117,24 +133,49 @@ class Executor:
         self.llm = llm
         self.prompt_template = prompt_template if prompt_template else DEFAULT_EXECUTOR_PROMPT
     
-    def execute(self, input_text: str, plan: List[str], **kwargs) -> str:
+    def execute(
+        self,
+        input_text: str,
+        plan: List[str],
+        completed_results: Optional[List[str]] = None,
+        on_step_done: Optional[Callable[[int, str, str], None]] = None,
+        tracker: Optional[BudgetTracker] = None,
+        **kwargs
+    ) -> str:
         """
         按计划执行任务
 
         Args:
             question: 原始问题
             plan: 执行计划
+            completed_results: 已完成步骤的结果（断点续跑时跳过这些步骤）
+            on_step_done: 每完成一步后的回调，参数为 (步骤序号, 步骤, 结果)
+            tracker: 本次运行的预算记录，预算用尽时停止执行后续步骤
             **kwargs: LLM调用参数
 
         Returns:
-            最终答案
+            最终答案，提前停止时为最后一个已完成步骤的结果
         """
+        tracker = tracker or BudgetTracker()
         history = ""
         final_answer = ""
+        completed_results = completed_results or []
+
+        # 根据已完成的结果恢复历史
+        for i, (step, response_text) in enumerate(zip(plan, completed_results), 1):
+            history += f"步骤{i}: {step}\n结果：{response_text}"
+            final_answer = response_text
 
         print("\n--- 正在执行计划 ---")
+        if completed_results:
+            print(f"从步骤 {len(completed_results) + 1} 继续执行")
 
         for i, step in enumerate(plan, 1):
+            if i <= len(completed_results):
+                continue
+            # 至少有一个步骤结果可以返回时才按预算提前停止
+            if final_answer and tracker.exhausted():
+                break
             print(f"\n-> 正在执行步骤 {i} / len(plan): {step}")
             prompt = self.prompt_template.format(
                 question=input_text,
@@ -143,11 +184,13 @@ class Executor:
                 current_step=step
             )    
             messages = [{"role": "user", "content": prompt}]
-            response_text = self.llm.invoke(messages, **kwargs)
+            response_text = tracker.invoke(self.llm, messages, **kwargs)
 
             history += f"步骤{i}: {step}\n结果：{response_text}"
             final_answer = response_text
             print(f"步骤 {i} 已完成，结果: {final_answer}")
+            if on_step_done:
+                on_step_done(i, step, response_text)
 
         return final_answer
 
@@ -159,42 +202,117 @@ class MyPlanAndSolveAgent(PlanAndSolveAgent):
         llm: HelloAgentsLLM,
         system_prompt: Optional[str] = None,
         config: Optional[Config] = None,
-        custom_prompts: Optional[Dict[str, str]] = None
+        custom_prompts: Optional[Dict[str, str]] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        role_llms: Optional[Dict[str, HelloAgentsLLM]] = None,
+        history_compress_min_bytes: Optional[int] = None,
+        budget: Optional[RunBudget] = None
     ):
+        """
+        Args:
+            role_llms: 按角色指定LLM，支持 "planner" 和 "executor"，
+                未指定的角色使用 llm，可传入 CascadeLLM 实现小模型优先
+            budget: 默认的单次运行预算，可在 run 时覆盖
+            history_compress_min_bytes: 指定后压缩超过该字节数的冷历史记录，默认不压缩
+        """
         super().__init__(name, llm, system_prompt, config)
+        # 使用固定容量的紧凑历史，容量取自 config.max_history_length
+        self._history = CompactHistory(
+            capacity=self.config.max_history_length, compress_min_bytes=history_compress_min_bytes
+        )
+        self.last_profile: Optional[dict] = None
+        self.checkpoint_store = checkpoint_store
+        self.last_run_id: Optional[str] = None
+        self.role_llms = role_llms or {}
+        self.budget = budget
+        self.last_run_stats: Optional[dict] = None
         
         # 设置提示词模板，用户自定义优先，否则使用默认模板
         planner_prompt = custom_prompts.get("planner") if custom_prompts else DEFAULT_PLANNER_PROMPT
         executor_prompt = custom_prompts.get("executor") if custom_prompts else DEFAULT_EXECUTOR_PROMPT
 
-        self.planner = Planner(self.llm, planner_prompt)
-        self.executor = Executor(self.llm, executor_prompt)
+        self.planner = Planner(self.role_llms.get("planner", self.llm), planner_prompt)
+        self.executor = Executor(self.role_llms.get("executor", self.llm), executor_prompt)
+
+    def get_role_stats(self) -> Dict[str, Dict[str, object]]:
+        """获取各角色级联LLM的延迟与升级率统计"""
+        return collect_role_stats(self.role_llms)
 
-    def run(self, question: str, **kwargs) -> str:
+    @profiled
+    def run(self, question: str, run_id: Optional[str] = None, budget: Optional[RunBudget] = None, **kwargs) -> str:
         """
         运行Plan and solve agent
+
+        Args:
+            question: 要解决的问题
+            run_id: 运行ID，配置了检查点存储时用于断点续跑，不传则自动生成
+            budget: 本次运行的预算，不传则使用初始化时的 budget；预算用尽时返回最后一个已完成步骤的结果
+            profile: 是否剖析本次运行，不传时按 AGENT_PROFILE_RATE 抽样
         """
         print(f"\n {self.name} 开始处理问题：{question}")
 
+        if self.checkpoint_store:
+            run_id = run_id or self.checkpoint_store.new_run_id()
+            self.checkpoint_store.append(run_id, {"type": "start", "agent": "plan_and_solve", "input": question})
+        self.last_run_id = run_id
+
+        return self._run_from(question, run_id, None, [], BudgetTracker(budget or self.budget), **kwargs)
+
+    def resume(self, run_id: str, budget: Optional[RunBudget] = None, **kwargs) -> str:
+        """从检查点恢复运行，从最后一个已完成的步骤之后继续，预算从恢复时重新计算"""
+        if not self.checkpoint_store:
+            raise ValueError("未配置检查点存储，无法恢复运行")
+
+        state = self.checkpoint_store.load(run_id)
+        if state["agent"] != "plan_and_solve":
+            raise ValueError(f"运行 {run_id} 属于 {state['agent']} Agent，无法由 plan_and_solve Agent 恢复")
+        self.last_run_id = run_id
+        if state["finished"]:
+            print(f"运行 {run_id} 已完成，直接返回结果")
+            return state["answer"]
+
+        print(f"\n {self.name} 恢复运行 {run_id}：已完成 {len(state['results'])} 个步骤")
+        tracker = BudgetTracker(budget or self.budget)
+        return self._run_from(state["input"], run_id, state["plan"], state["results"], tracker, **kwargs)
+
+    def _run_from(
+        self,
+        question: str,
+        run_id: Optional[str],
+        plan: Optional[List[str]],
+        completed_results: List[str],
+        tracker: BudgetTracker,
+        **kwargs
+    ) -> str:
+        """从给定的计划与已完成结果开始运行"""
+        store = self.checkpoint_store if run_id else None
+
         # 1. 生成计划
-        plan = self.planner.plan(question, **kwargs)
+        if plan is None:
+            plan = self.planner.plan(question, tracker=tracker, **kwargs)
+            if plan and store:
+                store.append(run_id, {"type": "plan", "plan": plan})
         if not plan:
             final_answer = "无法生成有效的行动计划，任务终止。"
             print(f"\n--- 任务终止 ---\n{final_answer}")
+            return self._save_turn(question, final_answer, tracker)
 
-            # 保存到历史记录
-            self.add_message(Message(question, "user"))
-            self.add_message(Message(final_answer, "assistant"))
-            
-            return final_answer
+        on_step_done = None
+        if store:
+            def on_step_done(index: int, step: str, result: str) -> None:
+                store.append(run_id, {"type": "step", "index": index, "step": step, "result": result})
 
         # 2. 按照计划执行
-        final_answer = self.executor.execute(question, plan, **kwargs)
+        final_answer = self.executor.execute(question, plan, completed_results, on_step_done, tracker, **kwargs)
         print(f"\n--- 任务完成 ---\n最终答案: {final_answer}")
-        
-        # 保存到历史记录
+        # 预算用尽时不记录 finish，之后可以 resume 继续剩余步骤
+        if store and not tracker.stop_reason:
+            store.append(run_id, {"type": "finish", "answer": final_answer})
+        return self._save_turn(question, final_answer, tracker)
+
+    def _save_turn(self, question: str, final_answer: str, tracker: BudgetTracker) -> str:
+        """保存历史记录，回答消息的 metadata 中记录本次花费"""
+        self.last_run_stats = tracker.to_dict()
         self.add_message(Message(question, "user"))
-        self.add_message(Message(final_answer, "assistant"))
-        
+        self.add_message(Message(final_answer, "assistant", metadata={"budget": self.last_run_stats}))
         return final_answer
-
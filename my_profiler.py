@@ -0,0 +1,277 @@
+"""
+运行级性能剖析 - 区分LLM等待、工具执行与本地CPU耗时，按 run_id 导出火焰图文件
+
+启用方式：
+- 单次运行：agent.run(..., profile=True)
+- 环境变量：AGENT_PROFILE_RATE=0.01 表示按 1% 的比例抽样剖析生产流量
+- AGENT_PROFILE_DIR 指定输出目录（默认 .profiles），AGENT_PROFILE_BACKEND 可选 sampling / cprofile
+
+采样后端在后台线程中定期读取运行线程的调用栈，开销与采样间隔成正比，
+导出 run_id.collapsed（可用 flamegraph.pl 绘制）和 run_id.speedscope.json；
+解释器不支持 sys._current_frames 或指定 cprofile 时退化为 cProfile，导出 run_id.prof。
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from hello_agents.tools.base import Tool
+
+# 调用栈中出现这些函数时归为对应阶段，从栈底向上第一个匹配的阶段生效
+LLM_FUNCS = {"invoke", "stream_invoke", "think", "ainvoke", "astream_invoke"}
+TOOL_FUNCS = {"execute_tool", "_execute_tool_call"}
+
+PHASES = ("llm", "tool", "cpu")
+
+
+def _classify(frames: list) -> str:
+    """根据调用栈判断当前处于哪个阶段"""
+    for frame in frames:
+        name = frame.f_code.co_name
+        if name in TOOL_FUNCS:
+            return "tool"
+        if name in LLM_FUNCS or name == "run":
+            owner = frame.f_locals.get("self")
+            if name == "run":
+                if isinstance(owner, Tool):
+                    return "tool"
+            elif hasattr(owner, "provider"):
+                return "llm"
+    return "cpu"
+
+
+class _Sampler(threading.Thread):
+    """后台采样线程"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="agent-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[str, ...], str, float]] = []
+        self._stop_event = threading.Event()
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            weight, last = now - last, now
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            self.samples.append((tuple(self._label(f.f_code) for f in frames), _classify(frames), weight))
+            del frames
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class RunProfiler:
+    """单次运行的性能剖析器，作为上下文管理器使用"""
+
+    def __init__(
+        self,
+        run_id: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        backend: Optional[str] = None,
+        interval: float = 0.005
+    ):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.output_dir = output_dir or os.getenv("AGENT_PROFILE_DIR", ".profiles")
+        backend = backend or os.getenv("AGENT_PROFILE_BACKEND", "sampling")
+        if backend == "sampling" and not hasattr(sys, "_current_frames"):
+            backend = "cprofile"
+        self.backend = backend
+        self.interval = interval
+        self.report: Dict[str, Any] = {}
+        self._sampler: Optional[_Sampler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._start = 0.0
+        self._skipped: Optional[str] = None
+
+    @staticmethod
+    def should_profile(profile: Optional[bool] = None) -> bool:
+        """profile 显式指定时以其为准，否则按 AGENT_PROFILE_RATE 抽样"""
+        if profile is not None:
+            return profile
+        rate = float(os.getenv("AGENT_PROFILE_RATE", "0") or 0)
+        return rate > 0 and random.random() < rate
+
+    def __enter__(self) -> "RunProfiler":
+        self._start = time.perf_counter()
+        if self.backend == "cprofile":
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError as e:
+                # 同一时间只能有一个 cProfile 在运行，其他线程的运行已经占用时跳过本次剖析
+                self._cprofile = None
+                self._skipped = str(e)
+        else:
+            self._sampler = _Sampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # 剖析失败不能影响运行本身，出错时只在 report 中记录原因
+        wall_time = time.perf_counter() - self._start
+        try:
+            if self._cprofile:
+                self._cprofile.disable()
+            elif self._sampler:
+                self._sampler.stop()
+            if self._skipped:
+                raise RuntimeError(self._skipped)
+            os.makedirs(self.output_dir, exist_ok=True)
+            if self._cprofile:
+                phase_times, files = self._export_cprofile(wall_time)
+                samples = 0
+            else:
+                phase_times, files = self._export_samples(wall_time)
+                samples = len(self._sampler.samples)
+        except Exception as e:
+            self.report = {
+                "run_id": self.run_id,
+                "backend": self.backend,
+                "wall_time": round(wall_time, 4),
+                "skipped": str(e),
+            }
+            print(f"⚠️ 性能剖析 {self.run_id} 已跳过：{e}")
+            return
+
+        self.report = {
+            "run_id": self.run_id,
+            "backend": self.backend,
+            "wall_time": round(wall_time, 4),
+            "llm_time": round(phase_times["llm"], 4),
+            "tool_time": round(phase_times["tool"], 4),
+            "cpu_time": round(phase_times["cpu"], 4),
+            "samples": samples,
+            "files": files,
+        }
+        print(
+            f"📊 性能剖析 {self.run_id}：总耗时 {wall_time:.3f}s，"
+            f"LLM {phase_times['llm']:.3f}s，工具 {phase_times['tool']:.3f}s，本地 {phase_times['cpu']:.3f}s"
+        )
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.output_dir, f"{self.run_id}{suffix}")
+
+    def _export_samples(self, wall_time: float) -> Tuple[Dict[str, float], List[str]]:
+        samples = self._sampler.samples
+        phase_weights = Counter()
+        collapsed = Counter()
+        for stack, phase, weight in samples:
+            phase_weights[phase] += weight
+            collapsed[(phase,) + stack] += 1
+
+        # 按采样权重比例把总耗时分配到各阶段
+        total = sum(phase_weights.values())
+        phase_times = {
+            phase: wall_time * phase_weights[phase] / total if total else (wall_time if phase == "cpu" else 0.0)
+            for phase in PHASES
+        }
+
+        collapsed_path = self._path(".collapsed")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, count in collapsed.items():
+                f.write(";".join(stack) + f" {count}\n")
+
+        frame_index: Dict[str, int] = {}
+        frames: List[Dict[str, str]] = []
+        speedscope_samples = []
+        weights = []
+        for stack, phase, weight in samples:
+            indices = []
+            for label in (f"[{phase}]",) + stack:
+                index = frame_index.get(label)
+                if index is None:
+                    index = frame_index[label] = len(frames)
+                    frames.append({"name": label})
+                indices.append(index)
+            speedscope_samples.append(indices)
+            weights.append(round(weight, 6))
+
+        speedscope_path = self._path(".speedscope.json")
+        with open(speedscope_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": self.run_id,
+                "exporter": "my_profiler",
+                "shared": {"frames": frames},
+                "profiles": [{
+                    "type": "sampled",
+                    "name": self.run_id,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 6),
+                    "samples": speedscope_samples,
+                    "weights": weights,
+                }],
+            }, f, ensure_ascii=False)
+        return phase_times, [collapsed_path, speedscope_path]
+
+    def _export_cprofile(self, wall_time: float) -> Tuple[Dict[str, float], List[str]]:
+        stats = pstats.Stats(self._cprofile)
+        prof_path = self._path(".prof")
+        stats.dump_stats(prof_path)
+
+        # 只统计最外层的LLM/工具调用，避免嵌套调用（如 MyLLM.invoke -> HelloAgentsLLM.invoke）重复计时
+        def outermost(names: set) -> float:
+            total = 0.0
+            for (_, _, func_name), (_, _, _, cumulative, callers) in stats.stats.items():
+                if func_name in names and not any(caller[2] in names for caller in callers):
+                    total += cumulative
+            return total
+
+        llm_time = outermost(LLM_FUNCS)
+        tool_time = outermost(TOOL_FUNCS)
+        phase_times = {
+            "llm": llm_time,
+            "tool": tool_time,
+            "cpu": max(wall_time - llm_time - tool_time, 0.0),
+        }
+        return phase_times, [prof_path]
+
+
+def profiled(run: Callable) -> Callable:
+    """
+    Agent.run 装饰器：支持 profile 参数与环境变量抽样
+
+    剖析结果保存在 agent.last_profile。配置了检查点存储的 Agent 使用同一个 run_id，
+    便于把火焰图和检查点对应起来。
+    """
+    @functools.wraps(run)
+    def wrapper(self, *args, profile: Optional[bool] = None, **kwargs):
+        if not RunProfiler.should_profile(profile):
+            return run(self, *args, **kwargs)
+        checkpoint_store = getattr(self, "checkpoint_store", None)
+        if checkpoint_store and not kwargs.get("run_id") and len(args) < 2:
+            kwargs["run_id"] = checkpoint_store.new_run_id()
+        profiler = RunProfiler(run_id=kwargs.get("run_id"))
+        try:
+            with profiler:
+                return run(self, *args, **kwargs)
+        finally:
+            self.last_profile = profiler.report
+    return wrapper
@@ -1,5 +1,11 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from hello_agents import Config, HelloAgentsLLM, Message, ReActAgent, ToolRegistry
+from my_budget import BudgetTracker, RunBudget
+from my_checkpoint import CheckpointStore
+from my_history import CompactHistory
+from my_profiler import profiled
+from my_tool_call_parser import parse_action, parse_react_output
+from my_tool_registry import ToolDescriptionCache
 
 
 MY_REACT_PROMPT = """你是一个具备推理和行动能力的AI助手。你可以通过思考分析问题，然后调用合适的工具来获取信息，最终给出准确的答案。
@@ -39,21 +45,72 @@ class MyReActAgent(ReActAgent):
         system_prompt: Optional[str] = None,
         config: Optional[Config] = None,
         max_steps: int = 5,
-        custom_prompt: Optional[str] = None
+        custom_prompt: Optional[str] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        tool_description_top_k: Optional[int] = None,
+        budget: Optional[RunBudget] = None,
+        history_compress_min_bytes: Optional[int] = None
     ):
+        """
+        Args:
+            tool_description_top_k: 工具数超过该值时，提示词中只列出与问题最相关的 top_k 个工具
+            budget: 默认的单次运行预算，可在 run 时覆盖
+            history_compress_min_bytes: 指定后压缩超过该字节数的冷历史记录，默认不压缩
+        """
         super().__init__(name, llm, tool_registry, system_prompt, config)  
+        # 使用固定容量的紧凑历史，容量取自 config.max_history_length
+        self._history = CompactHistory(
+            capacity=self.config.max_history_length, compress_min_bytes=history_compress_min_bytes
+        )
+        self.last_profile: Optional[dict] = None
         self.max_steps = max_steps
         self.custom_prompt = custom_prompt if custom_prompt else MY_REACT_PROMPT
         self.current_history: List[str] = []
+        self.checkpoint_store = checkpoint_store
+        self.last_run_id: Optional[str] = None
+        self.tool_description_top_k = tool_description_top_k
+        self._tool_descriptions = ToolDescriptionCache()
+        self.budget = budget
+        self.last_run_stats: Optional[dict] = None
         print(f"{name} 初始化完成，最大步数：{max_steps}")
 
-    def run(self, input_text: str, **kwargs) -> str:
-        """运行ReAct Agent"""
+    @profiled
+    def run(self, input_text: str, run_id: Optional[str] = None, budget: Optional[RunBudget] = None, **kwargs) -> str:
+        """运行ReAct Agent，budget 不传则使用初始化时的预算"""
+        if self.checkpoint_store:
+            run_id = run_id or self.checkpoint_store.new_run_id()
+            self.checkpoint_store.append(run_id, {"type": "start", "agent": "react", "input": input_text})
+        self.last_run_id = run_id
+
         self.current_history = []
-        current_step = 0
-        
-        while current_step < self.max_steps:
-            tools_description = self.tool_registry.get_tools_description()
+        return self._run_loop(input_text, run_id, 0, BudgetTracker(budget or self.budget), **kwargs)
+
+    def resume(self, run_id: str, budget: Optional[RunBudget] = None, **kwargs) -> str:
+        """从检查点恢复运行，从最后一个已完成的步骤之后继续，预算从恢复时重新计算"""
+        if not self.checkpoint_store:
+            raise ValueError("未配置检查点存储，无法恢复运行")
+
+        state = self.checkpoint_store.load(run_id)
+        if state["agent"] != "react":
+            raise ValueError(f"运行 {run_id} 属于 {state['agent']} Agent，无法由 react Agent 恢复")
+        self.last_run_id = run_id
+        if state["finished"]:
+            print(f"运行 {run_id} 已完成，直接返回结果")
+            return state["answer"]
+
+        print(f"{self.name} 恢复运行 {run_id}：已完成 {state['react_step']} 步")
+        self.current_history = list(state["history"])
+        return self._run_loop(state["input"], run_id, state["react_step"], BudgetTracker(budget or self.budget), **kwargs)
+
+    def _run_loop(self, input_text: str, run_id: Optional[str], current_step: int, tracker: BudgetTracker, **kwargs) -> str:
+        """ReAct 主循环，从 current_step 开始执行，预算用尽时提前停止"""
+        store = self.checkpoint_store if run_id else None
+
+        while current_step < self.max_steps and not tracker.exhausted():
+            history_len = len(self.current_history)
+            tools_description = self._tool_descriptions.describe(
+                self.tool_registry, input_text, self.tool_description_top_k
+            )
             history_str = "\n".join(self.current_history)
             # 1. 构建提示词
             prompt = self.custom_prompt.format(
@@ -64,10 +121,7 @@ class MyReActAgent(ReActAgent):
 
             # 2. 调用LLM
             messages = [{"role": "user", "content": prompt}]
-            response = self.llm.invoke(
-                messages=messages,
-                **kwargs
-            )
+            response = tracker.invoke(self.llm, messages, **kwargs)
 
             # 3. 解析输出
             thought, action = self._parse_output(response)
@@ -78,10 +132,7 @@ class MyReActAgent(ReActAgent):
 
             # 4. 检查完成度
             if action and action.startswith("Finish"):
-                final_answer = self._parse_action_input(action)
-                self.add_message(Message(input_text, "user"))
-                self.add_message(Message(final_answer, "assistant"))
-                return final_answer
+                return self._finish(input_text, self._parse_action_input(action), run_id, tracker)
 
             # 5. 执行工具调用
             if action:
@@ -91,8 +142,43 @@ class MyReActAgent(ReActAgent):
                     self.current_history.append(f"Action: {action}")
                     self.current_history.append(f"Observation: {observation}")
 
-        # 6. 达到最大步数
-        final_answer = "抱歉，我无法在限定步数内完成这个任务。"
+            # 记录本步新增的历史
+            if store:
+                store.append(run_id, {"type": "react_step", "step": current_step, "lines": self.current_history[history_len:]})
+
+        # 6. 达到最大步数或预算用尽，返回目前最好的结果
+        return self._finish(input_text, self._best_effort_answer(), run_id, tracker)
+
+    def _best_effort_answer(self) -> str:
+        """未能 Finish 时使用最近一次成功的观察结果，没有可用的观察结果时返回失败提示"""
+        for line in reversed(self.current_history):
+            # 思考只是下一步的打算，工具报错的观察结果也不能作为答案
+            if line.startswith("Observation: ") and not line.startswith("Observation: 错误"):
+                return line[len("Observation: "):]
+        return "抱歉，我无法在限定步数内完成这个任务。"
+
+    def _finish(self, input_text: str, final_answer: str, run_id: Optional[str], tracker: BudgetTracker) -> str:
+        """记录完成检查点并保存历史，回答消息的 metadata 中记录本次花费"""
+        # 预算用尽时不记录 finish，之后可以 resume 继续
+        if run_id and self.checkpoint_store and not tracker.stop_reason:
+            self.checkpoint_store.append(run_id, {"type": "finish", "answer": final_answer})
+        self.last_run_stats = tracker.to_dict()
         self.add_message(Message(input_text, "user"))
-        self.add_message(Message(final_answer, "assistant"))
-        return final_answer
\ No newline at end of file
+        self.add_message(Message(final_answer, "assistant", metadata={"budget": self.last_run_stats}))
+        return final_answer
+
+    def _parse_output(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """解析LLM输出，提取思考和行动"""
+        return parse_react_output(text)
+
+    def _parse_action(self, action_text: str) -> Tuple[Optional[str], Optional[str]]:
+        """解析行动文本，提取工具名称和输入"""
+        call = parse_action(action_text)
+        if call:
+            return call.name, call.parameters
+        return None, None
+
+    def _parse_action_input(self, action_text: str) -> str:
+        """解析行动输入"""
+        call = parse_action(action_text)
+        return call.parameters if call else ""
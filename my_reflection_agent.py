@@ -1,5 +1,11 @@
-from typing import List, Optional, Dict
+import json
+import re
+from typing import List, Optional, Dict, Tuple
 from hello_agents import Config, ReflectionAgent, HelloAgentsLLM, Message, ToolRegistry
+from my_budget import BudgetTracker, RunBudget
+from my_cascade import CascadeLLM, collect_role_stats
+from my_history import CompactHistory
+from my_profiler import profiled
 
 DEFAULT_PROMPTS = {
     "initial": """
@@ -38,9 +44,83 @@ DEFAULT_PROMPTS = {
 {feedback}
 
 请提供一个改进后的回答。
+""",
+    "verdict": """
+请审查以下回答是否正确完成了任务。
+
+# 原始任务:
+{task}
+
+# 当前回答:
+{content}
+
+只有存在功能错误、逻辑问题或明显不符合要求时才判定 revise，否则判定 accept。
+只输出一行 JSON，不要输出其他内容，issues 最多 3 条、每条不超过 20 字：
+{{"verdict": "accept 或 revise", "issues": ["问题"]}}
+""",
+    "feedback": """
+以下回答存在这些问题：
+{issues}
+
+# 原始任务:
+{task}
+
+# 当前回答:
+{content}
+
+请针对这些问题给出具体的修改意见：
 """
 }
 
+# 自由格式反思中表示无需继续改进的短语，预先转为小写
+STOP_SIGNALS = tuple(signal.lower() for signal in (
+    "无需改进",
+    "已经很好",
+    "质量很高",
+    "整体质量较高",
+    "满足要求",
+    "no need for improvement",
+    "looks good",
+    "sufficiently good"
+))
+
+_VERDICT_FIELD = re.compile(r'"verdict"\s*:\s*"(accept|revise)"', re.IGNORECASE)
+
+
+def is_good_enough(reflect_response: str) -> bool:
+    """自由格式反思是否认为回答已足够好"""
+    text = reflect_response.lower()
+    return any(signal in text for signal in STOP_SIGNALS)
+
+
+def parse_verdict(text: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    解析结构化反思结论
+
+    Returns:
+        ("accept" 或 "revise", 问题列表)，无法解析时返回 None
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            verdict = str(data.get("verdict", "")).strip().lower()
+            issues = data.get("issues") or []
+            if verdict in ("accept", "revise"):
+                if not isinstance(issues, list):
+                    issues = [issues]
+                return verdict, [str(issue) for issue in issues if issue]
+
+    # 输出被 max_tokens 截断时 JSON 不完整，退而只取 verdict 字段
+    match = _VERDICT_FIELD.search(text)
+    if match:
+        return match.group(1).lower(), []
+    return None
+
+
 class MyReflectionAgent(ReflectionAgent):
     def __init__(
         self,
@@ -49,71 +129,139 @@ class MyReflectionAgent(ReflectionAgent):
         system_prompt: Optional[str] = None,
         config: Optional[Config] = None,
         max_iterations: int = 3,
-        custom_prompts: Optional[Dict[str, str]] = None
+        custom_prompts: Optional[Dict[str, str]] = None,
+        role_llms: Optional[Dict[str, HelloAgentsLLM]] = None,
+        budget: Optional[RunBudget] = None,
+        reflect_mode: str = "freeform",
+        verdict_max_tokens: int = 128,
+        history_compress_min_bytes: Optional[int] = None
     ):
+        """
+        Args:
+            role_llms: 按角色指定LLM，支持 "initial"、"reflect" 和 "refine"，
+                未指定的角色使用 llm，可传入 CascadeLLM 实现小模型优先
+            budget: 默认的单次运行预算，可在 run 时覆盖
+            reflect_mode: "freeform" 自由格式反思并匹配停止短语；
+                "verdict" 先以 verdict_max_tokens 为上限请求 JSON 结论（accept/revise 与简短问题列表），
+                只有判定 revise 时才请求详细的修改意见
+            verdict_max_tokens: verdict 模式下结论调用的 max_tokens
+            history_compress_min_bytes: 指定后压缩超过该字节数的冷历史记录，默认不压缩
+        """
+        if reflect_mode not in ("freeform", "verdict"):
+            raise ValueError(f"未知的反思模式：{reflect_mode}")
         super().__init__(name, llm, system_prompt, config)
+        # 使用固定容量的紧凑历史，容量取自 config.max_history_length
+        self._history = CompactHistory(
+            capacity=self.config.max_history_length, compress_min_bytes=history_compress_min_bytes
+        )
+        self.last_profile: Optional[dict] = None
         self.max_iterations = max_iterations
         self.custom_prompts = custom_prompts
+        self.role_llms = role_llms or {}
+        self.budget = budget
+        self.last_run_stats: Optional[dict] = None
+        self.reflect_mode = reflect_mode
+        self.verdict_max_tokens = verdict_max_tokens
     
-    def _get_llm_response(self, prompt: str, **kwargs) -> str:
-        """调用LLM并获取完整响应"""
+    def _get_llm_response(self, prompt: str, role: str = "initial", tracker: Optional[BudgetTracker] = None, **kwargs) -> str:
+        """调用指定角色的LLM并获取完整响应"""
         messages = [{"role": "user", "content": prompt}]
+        llm = self.role_llms.get(role, self.llm)
+        tracker = tracker or BudgetTracker()
         # 使用 invoke 而不是 stream_invoke，因为需要完整的字符串
-        return self.llm.invoke(messages, **kwargs) or ""
+        return tracker.invoke(llm, messages, **kwargs) or ""
+
+    def get_role_stats(self) -> Dict[str, Dict[str, object]]:
+        """获取各角色级联LLM的延迟与升级率统计"""
+        return collect_role_stats(self.role_llms)
     
-    def run(self, input_text: str, **kwargs) -> str:
-        print(f"\n--- 开始处理任务 ---\n任务：{input_text}")
+    @profiled
+    def run(self, input_text: str, budget: Optional[RunBudget] = None, **kwargs) -> str:
+        """
+        运行反思循环
 
-        # memory
-        memory = []
+        Args:
+            input_text: 任务
+            budget: 本次运行的预算，不传则使用初始化时的 budget；预算用尽或达到最大迭代次数时返回最新一版回答
+        """
+        print(f"\n--- 开始处理任务 ---\n任务：{input_text}")
+        tracker = BudgetTracker(budget or self.budget)
 
         # llm invoke (inital)
         print("\n--- 正在进行初始尝试 ---")
         initial_prompt = DEFAULT_PROMPTS["initial"].format(task=input_text)
-        initial_response = self._get_llm_response(initial_prompt, **kwargs)
+        initial_response = self._get_llm_response(initial_prompt, role="initial", tracker=tracker, **kwargs)
         print(f"\n首次响应：{initial_response}\n")
-        memory.append(input_text)
-        memory.append(initial_response)
+        # 只保留最新一版回答，历史草稿不再累积
+        last_response = initial_response
 
         # for loop
         for i in range(self.max_iterations):
+            if tracker.exhausted():
+                break
+
             # llm invoke (reflect)
-            last_response = memory[-1]
-            reflect_prompt = DEFAULT_PROMPTS["reflect"].format(task=input_text, content=last_response)
-            reflect_response = self._get_llm_response(reflect_prompt, **kwargs)
+            accepted, reflect_response = self._reflect(input_text, last_response, tracker, **kwargs)
             print(f"\n反思：{reflect_response}\n")
-           
+
             # 检查是否应该停止迭代
-            stop_signals = [
-                "无需改进",
-                "已经很好",
-                "质量很高",
-                "整体质量较高",
-                "满足要求",
-                "no need for improvement",
-                "looks good",
-                "sufficiently good"
-            ]
-            
-            if any(signal in reflect_response.lower() for signal in [s.lower() for s in stop_signals]):
+            if accepted:
                 print(f"\n✅ 反思认为结果已足够好，停止迭代")
-                self.add_message(Message(input_text, "user"))
-                self.add_message(Message(last_response, "assistant"))
-                
-                return last_response
-            else:
-                # llm invoke (refine)
-                refine_prompt = DEFAULT_PROMPTS["refine"].format(
-                    task=input_text,
-                    last_attempt=last_response,
-                    feedback=reflect_response
-                )
-                refined_response = self._get_llm_response(refine_prompt, **kwargs)
-                print(f"\n第 {i+1} 次修改后代码：{refined_response}\n")
-                memory.append(refined_response)
-        
-        print("已达到最大迭代次数")
-        final_answer = "抱歉，我无法在限定步数内完成这个任务。"
+                return self._finish(input_text, last_response, tracker)
+            if tracker.exhausted():
+                break
+
+            # llm invoke (refine)
+            refine_prompt = DEFAULT_PROMPTS["refine"].format(
+                task=input_text,
+                last_attempt=last_response,
+                feedback=reflect_response
+            )
+            refined_response = self._get_llm_response(refine_prompt, role="refine", tracker=tracker, **kwargs)
+            print(f"\n第 {i+1} 次修改后代码：{refined_response}\n")
+            last_response = refined_response
+        else:
+            print("已达到最大迭代次数，返回最新一版回答")
+
+        return self._finish(input_text, last_response, tracker)
+
+    def _reflect(self, input_text: str, content: str, tracker: BudgetTracker, **kwargs) -> Tuple[bool, str]:
+        """
+        反思当前回答
+
+        Returns:
+            (是否接受, 反馈意见)；接受时反馈意见为反思原文
+        """
+        if self.reflect_mode == "freeform":
+            reflect_prompt = DEFAULT_PROMPTS["reflect"].format(task=input_text, content=content)
+            reflect_response = self._get_llm_response(reflect_prompt, role="reflect", tracker=tracker, **kwargs)
+            return is_good_enough(reflect_response), reflect_response
+
+        verdict_prompt = DEFAULT_PROMPTS["verdict"].format(task=input_text, content=content)
+        verdict_kwargs = {**kwargs, "max_tokens": self.verdict_max_tokens}
+        if isinstance(self.role_llms.get("reflect", self.llm), CascadeLLM):
+            # 级联模式下，小模型的结论无法解析时升级到大模型
+            verdict_kwargs["validator"] = lambda text: parse_verdict(text) is not None
+        verdict_response = self._get_llm_response(verdict_prompt, role="reflect", tracker=tracker, **verdict_kwargs)
+        parsed = parse_verdict(verdict_response)
+        if parsed is None:
+            # 模型没有按格式输出时按自由格式的停止短语判断
+            return is_good_enough(verdict_response), verdict_response
+
+        verdict, issues = parsed
+        if verdict == "accept":
+            return True, verdict_response
+        issues_text = "\n".join(f"- {issue}" for issue in issues) or "- 未列出具体问题"
+        if tracker.exhausted():
+            return False, issues_text
+
+        # 只有需要修改时才请求详细的修改意见
+        feedback_prompt = DEFAULT_PROMPTS["feedback"].format(issues=issues_text, task=input_text, content=content)
+        return False, self._get_llm_response(feedback_prompt, role="reflect", tracker=tracker, **kwargs)
+
+    def _finish(self, input_text: str, answer: str, tracker: BudgetTracker) -> str:
+        """保存历史并在回答消息的 metadata 中记录本次花费"""
+        self.last_run_stats = tracker.to_dict()
         self.add_message(Message(input_text, "user"))
-        self.add_message(Message(final_answer, "assistant"))
-        return final_answer
+        self.add_message(Message(answer, "assistant", metadata={"budget": self.last_run_stats}))
+        return answer
@@ -0,0 +1,319 @@
+"""语义答案缓存 - 基于哈希 n-gram 向量与余弦相似度的跨会话答案复用"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 数字与运算符决定了计算类问题的答案，必须完全一致才算命中
+_EXACT_TOKEN = re.compile(
+    r"\d+(?:\.\d+)?|[-+*/×÷^%=<>]|sqrt|plus|minus|times|multipl|divid|mod|power|加|减|乘|除|平方|开方|次方|余"
+)
+# 空白与标点不携带语义
+_NON_WORD = re.compile(r"[\W_]+")
+# 疑问词与虚词，改写时经常增删，不参与比较
+_STOP_WORDS = re.compile(
+    r"请问|请|一下|什么|怎么|怎样|如何|哪里|哪儿|哪个|哪些|是|的|了|吗|呢|吧|啊|呀"
+    r"|\b(?:what|which|how|is|are|the|a|an|of|please)\b"
+)
+# 英文单词与数字整体作为一个词，中日韩文字每个字作为一个词
+_CONTENT_TERM = re.compile(r"[a-z0-9]+|[^\W\d_a-z]")
+
+
+def exact_signature(text: str) -> Tuple[str, ...]:
+    """提取问题中按顺序出现的数字与运算符"""
+    return tuple(_EXACT_TOKEN.findall(text.lower()))
+
+
+def normalize_question(text: str) -> str:
+    """去掉疑问词、虚词、空白与标点，只保留实词"""
+    return _NON_WORD.sub("", _STOP_WORDS.sub(" ", text.lower()))
+
+
+def content_terms(text: str) -> FrozenSet[str]:
+    """问题中的实词集合"""
+    return frozenset(_CONTENT_TERM.findall(_STOP_WORDS.sub(" ", text.lower())))
+
+
+def is_substitution(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """
+    两个问题是否各自含有对方没有的实词
+
+    "法国的首都" 与 "德国的首都" 只差一个字，n-gram 相似度很高，但这是替换而不是改写；
+    只在一侧增加实词（"法国的首都" 与 "法国首都是哪个城市"）仍视为改写。
+    """
+    return bool(a - b) and bool(b - a)
+
+
+class HashedNgramVectorizer:
+    """
+    哈希字符 n-gram 向量化器
+
+    不依赖任何模型：去掉疑问词与虚词后把文本切成字符 n-gram，用 crc32 哈希到固定维度并带符号累加，
+    最后做 L2 归一化。默认不使用单字，否则只差一个字的问题（如 "法国" 与 "德国"）相似度过高。
+    """
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (2, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _normalize(self, text: str) -> str:
+        return normalize_question(text)
+
+    def transform(self, text: str) -> np.ndarray:
+        """把文本转换为归一化向量，空文本返回零向量"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = self._normalize(text)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i:i + n].encode("utf-8"))
+                # 最高位决定符号，减少哈希冲突带来的偏差
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def transform_many(self, texts: Sequence[str]) -> np.ndarray:
+        """批量向量化"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.transform(text)
+        return matrix
+
+
+class SemanticAnswerCache:
+    """
+    语义答案缓存
+
+    - 向量保存在固定容量的 NumPy 矩阵中，指定 path 时使用内存映射文件持久化
+    - 查询时对所有已用槽位做一次矩阵乘法得到余弦相似度，再用 argpartition 取 top-k
+    - 插入是增量的，容量满时淘汰最久未命中的条目（LRU）
+    - 问题与答案以追加方式写入 path.jsonl，加载时回放；日志行数超过 capacity 的
+      compact_factor 倍时重写为只包含当前条目的日志
+    - 命中要求数字与运算符序列完全一致，且 namespace 相同（例如由系统提示与工具集合得到），
+      避免 "123 乘以 457" 命中 "123 乘以 456" 的答案，或者命中其他角色设定下的答案
+    - 两个问题各自含有对方没有的实词时视为替换（"法国的首都" 与 "德国的首都"），不命中
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dim: int = 256,
+        capacity: int = 100_000,
+        threshold: float = 0.8,
+        vectorizer: Optional[HashedNgramVectorizer] = None,
+        compact_factor: int = 2
+    ):
+        """
+        Args:
+            path: 持久化文件前缀（生成 path.npy 和 path.jsonl），为 None 时仅保存在内存中
+            dim: 向量维度
+            capacity: 最大条目数
+            threshold: 命中所需的最低余弦相似度
+            vectorizer: 向量化器，默认使用 HashedNgramVectorizer(dim)
+            compact_factor: 元数据日志行数超过 capacity * compact_factor 时压缩
+        """
+        self.path = path
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.vectorizer = vectorizer or HashedNgramVectorizer(dim)
+        self.compact_factor = compact_factor
+
+        self._lock = threading.Lock()
+        self._questions: List[Optional[str]] = [None] * capacity
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._namespaces: List[str] = [""] * capacity
+        self._signatures: List[Tuple[str, ...]] = [()] * capacity
+        self._terms: List[FrozenSet[str]] = [frozenset()] * capacity
+        self._log_lines = 0
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._size = 0
+
+        if path:
+            self._vectors = self._open_vectors(f"{path}.npy")
+            self._load_metadata(f"{path}.jsonl")
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+    def _open_vectors(self, vectors_path: str) -> np.ndarray:
+        if os.path.exists(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            if vectors.shape != (self.capacity, self.dim):
+                raise ValueError(f"缓存文件形状 {vectors.shape} 与配置 ({self.capacity}, {self.dim}) 不一致")
+            return vectors
+        return np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=(self.capacity, self.dim))
+
+    def _load_metadata(self, metadata_path: str) -> None:
+        if not os.path.exists(metadata_path):
+            return
+        torn = False
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._log_lines += 1
+                torn = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中断留下的半行，跳过
+                    continue
+                slot = record["slot"]
+                self._set_slot(slot, record["question"], record["answer"], record.get("namespace", ""))
+                self._clock += 1
+                self._last_used[slot] = self._clock
+                self._size = max(self._size, slot + 1)
+        # 末尾半行会和之后追加的记录粘在一起，重写日志把它去掉
+        if torn or self._log_lines > self.capacity * self.compact_factor:
+            self._compact()
+
+    def _set_slot(self, slot: int, question: str, answer: str, namespace: str) -> None:
+        self._questions[slot] = question
+        self._answers[slot] = answer
+        self._namespaces[slot] = namespace
+        self._signatures[slot] = exact_signature(question)
+        self._terms[slot] = content_terms(question)
+
+    def _record(self, slot: int) -> str:
+        return json.dumps({
+            "slot": slot,
+            "question": self._questions[slot],
+            "answer": self._answers[slot],
+            "namespace": self._namespaces[slot],
+        }, ensure_ascii=False) + "\n"
+
+    def _compact(self) -> None:
+        """把元数据日志重写为每个已用槽位一行"""
+        metadata_path = f"{self.path}.jsonl"
+        tmp_path = metadata_path + ".tmp"
+        # 按最近使用时间写出，加载回放后 LRU 顺序保持不变
+        slots = sorted(range(self._size), key=lambda i: self._last_used[i])
+        slots = [slot for slot in slots if self._questions[slot] is not None]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for slot in slots:
+                f.write(self._record(slot))
+        os.replace(tmp_path, metadata_path)
+        self._log_lines = len(slots)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def search(self, question: str, top_k: int = 1) -> List[Tuple[float, str, str]]:
+        """
+        查找最相似的 top_k 个条目
+
+        Returns:
+            [(相似度, 缓存的问题, 缓存的答案), ...]，按相似度降序
+        """
+        query = self.vectorizer.transform(question)
+        with self._lock:
+            return self._search_vector(query, top_k)
+
+    def _search_vector(self, query: np.ndarray, top_k: int) -> List[Tuple[float, str, str]]:
+        if self._size == 0 or not query.any():
+            return []
+        scores = self._vectors[:self._size] @ query
+        k = min(top_k, self._size)
+        if k < self._size:
+            indices = np.argpartition(-scores, k - 1)[:k]
+        else:
+            indices = np.arange(self._size)
+        indices = indices[np.argsort(-scores[indices])]
+        return [(float(scores[i]), self._questions[i], self._answers[i]) for i in indices]
+
+    def _best_match(self, query: np.ndarray, question: str, namespace: str, threshold: float) -> Optional[int]:
+        """相似度不低于 threshold、数字与运算符及 namespace 都一致且不是实词替换的最相似条目"""
+        if self._size == 0:
+            return None
+        scores = self._vectors[:self._size] @ query
+        candidates = np.flatnonzero(scores >= threshold)
+        if not len(candidates):
+            return None
+        signature = exact_signature(question)
+        terms = content_terms(question)
+        for i in candidates[np.argsort(-scores[candidates])]:
+            if (
+                self._namespaces[i] == namespace
+                and self._signatures[i] == signature
+                and not is_substitution(self._terms[i], terms)
+            ):
+                return int(i)
+        return None
+
+    def get(self, question: str, namespace: str = "") -> Optional[str]:
+        """相似度达到阈值且数字、运算符、namespace 一致并且不是实词替换时返回缓存的答案，否则返回 None"""
+        query = self.vectorizer.transform(question)
+        if not query.any():
+            return None
+        with self._lock:
+            best = self._best_match(query, question, namespace, self.threshold)
+            if best is None:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._answers[best]
+
+    def put(self, question: str, answer: str, namespace: str = "") -> None:
+        """插入一条问答，问题与已有条目几乎相同时覆盖该条目"""
+        query = self.vectorizer.transform(question)
+        if not query.any():
+            return
+        with self._lock:
+            slot = self._best_match(query, question, namespace, 0.999)
+            self._store(slot, query, question, answer, namespace)
+
+    def put_vectors(self, vectors: np.ndarray, questions: Sequence[str], answers: Sequence[str], namespace: str = "") -> None:
+        """批量插入已经向量化的问答（不做去重）"""
+        with self._lock:
+            for vector, question, answer in zip(vectors, questions, answers):
+                self._store(None, vector, question, answer, namespace)
+
+    def _store(self, slot: Optional[int], vector: np.ndarray, question: str, answer: str, namespace: str = "") -> None:
+        if slot is None:
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+            else:
+                # 淘汰最久未使用的条目
+                slot = int(np.argmin(self._last_used))
+        self._vectors[slot] = vector
+        self._set_slot(slot, question, answer, namespace)
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+        if self.path:
+            # 先落盘向量再追加元数据，崩溃时不会出现有答案但向量为零的槽位
+            self._vectors.flush()
+            with open(f"{self.path}.jsonl", "a", encoding="utf-8") as f:
+                f.write(self._record(slot))
+            self._log_lines += 1
+            if self._log_lines > self.capacity * self.compact_factor:
+                self._compact()
+
+    def flush(self) -> None:
+        """把内存映射的向量写回磁盘"""
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._vectors[:] = 0
+            self._questions = [None] * self.capacity
+            self._answers = [None] * self.capacity
+            self._namespaces = [""] * self.capacity
+            self._signatures = [()] * self.capacity
+            self._terms = [frozenset()] * self.capacity
+            self._log_lines = 0
+            self._last_used[:] = 0
+            self._clock = 0
+            self._size = 0
+            if self.path and os.path.exists(f"{self.path}.jsonl"):
+                os.remove(f"{self.path}.jsonl")
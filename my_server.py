@@ -0,0 +1,434 @@
+"""
+异步 HTTP 服务入口：python -m my_server [--stub-llm]
+
+- POST /v1/agents/{simple|react|plan_and_solve|reflection}/run
+  请求体 {"session_id": "...", "input": "...", "stream": false}
+  stream 为 true 时以 SSE 返回（simple 逐片段推送，其余 Agent 推送最终结果）
+- GET /healthz 健康检查
+- GET /metrics 运行指标（排队数、拒绝数、延迟分位数）
+
+同一会话内的请求串行执行（共享对话历史），不同会话并发执行；
+全局和单会话的排队数量都有上限，超出时返回 429。LLM 客户端在会话之间共享。
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from hello_agents import HelloAgentsLLM
+from hello_agents.core.agent import Agent
+from my_calculator_tool import create_calculator_registry
+from my_plan_solve_agent import MyPlanAndSolveAgent
+from my_react_agent import MyReActAgent
+from my_reflection_agent import MyReflectionAgent
+from my_simple_agent import MySimpleAgent
+
+AGENT_TYPES = ("simple", "react", "plan_and_solve", "reflection")
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+}
+
+
+def create_agent(agent_type: str, llm: HelloAgentsLLM) -> Agent:
+    """按类型创建 Agent"""
+    if agent_type == "simple":
+        return MySimpleAgent(name="simple", llm=llm, tool_registry=create_calculator_registry())
+    if agent_type == "react":
+        return MyReActAgent(name="react", llm=llm, tool_registry=create_calculator_registry())
+    if agent_type == "plan_and_solve":
+        return MyPlanAndSolveAgent(name="plan_and_solve", llm=llm)
+    if agent_type == "reflection":
+        return MyReflectionAgent(name="reflection", llm=llm)
+    raise ValueError(f"未知的 Agent 类型：{agent_type}")
+
+
+class StubLLM:
+    """
+    本地桩LLM，用于压测与离线调试
+
+    按提示词识别调用方（ReAct、规划器、反思）返回可被解析的固定格式，
+    每次调用休眠 latency 秒模拟网络耗时。
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.provider = "stub"
+        self.model = "stub"
+        self.latency = latency
+
+    def _respond(self, messages: list[dict[str, str]]) -> str:
+        prompt = messages[-1]["content"]
+        if "Thought" in prompt and "Action" in prompt:
+            return "Thought: 信息已经足够\nAction: Finish[stub answer]"
+        if "规划专家" in prompt:
+            return '```python\n["分析问题", "给出答案"]\n```'
+        if "审查" in prompt:
+            return "无需改进"
+        return "stub answer"
+
+    def invoke(self, messages: list[dict[str, str]], **kwargs) -> str:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    def stream_invoke(self, messages: list[dict[str, str]], **kwargs) -> Iterator[str]:
+        text = self._respond(messages)
+        for i in range(0, len(text), 4):
+            time.sleep(self.latency / max(len(text) // 4, 1))
+            yield text[i:i + 4]
+
+    def think(self, messages: list[dict[str, str]], temperature: Optional[float] = None) -> Iterator[str]:
+        yield from self.stream_invoke(messages)
+
+
+class LLMPool:
+    """LLM 客户端池：同一配置只创建一个实例，所有会话共享其连接池"""
+
+    def __init__(self, factory: Callable[[str], HelloAgentsLLM]):
+        self._factory = factory
+        self._llms: Dict[str, HelloAgentsLLM] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str = "default") -> HelloAgentsLLM:
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = self._llms[key] = self._factory(key)
+            return llm
+
+
+class Session:
+    """会话：每种 Agent 一个实例，请求通过 lock 串行执行"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.agents: Dict[str, Agent] = {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class StreamAborted(Exception):
+    """SSE 响应头发送后运行失败，错误已通过 error 事件告知客户端"""
+
+
+class AgentServer:
+    """异步 Agent 服务"""
+
+    def __init__(
+        self,
+        llm_pool: LLMPool,
+        max_inflight: int = 8,
+        max_queue: int = 64,
+        session_queue: int = 4,
+        max_sessions: int = 1000,
+        max_body_bytes: int = 1024 * 1024
+    ):
+        """
+        Args:
+            llm_pool: LLM 客户端池
+            max_inflight: 同时执行的 Agent 运行数（工作线程数）
+            max_queue: 全局排队上限，正在执行与排队的请求总数超过 max_inflight + max_queue 时返回 429
+            session_queue: 单个会话的排队上限（含正在执行的请求）
+            max_sessions: 保留的会话数，超出后淘汰最久未使用的空闲会话
+            max_body_bytes: 请求体大小上限，超出时返回 413
+        """
+        self.llm_pool = llm_pool
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.session_queue = session_queue
+        self.max_sessions = max_sessions
+        self.max_body_bytes = max_body_bytes
+
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="agent")
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._pending = 0
+        self._latencies: deque = deque(maxlen=10_000)
+        self.stats = {"requests": 0, "completed": 0, "rejected": 0, "errors": 0}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host, port)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, body = await self._read_request(reader)
+            if path == "/healthz":
+                await self._send_json(writer, 200, {"status": "ok"})
+            elif path == "/metrics":
+                await self._send_json(writer, 200, self.get_metrics())
+            elif path.startswith("/v1/agents/") and path.endswith("/run"):
+                if method != "POST":
+                    raise HTTPError(405, "只支持 POST")
+                agent_type = path[len("/v1/agents/"):-len("/run")]
+                await self._handle_run(writer, agent_type, body)
+            else:
+                raise HTTPError(404, "未知路径")
+        except HTTPError as e:
+            if e.status == 429:
+                self.stats["rejected"] += 1
+            await self._send_json(writer, e.status, {"error": e.message})
+        except StreamAborted:
+            self.stats["errors"] += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            self.stats["errors"] += 1
+            await self._send_json(writer, 500, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "无效的请求行")
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    raise HTTPError(400, "无效的 Content-Length")
+                if length < 0:
+                    raise HTTPError(400, "无效的 Content-Length")
+                if length > self.max_body_bytes:
+                    raise HTTPError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], body
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Internal Server Error')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _send_event(self, writer: asyncio.StreamWriter, event: str, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False)
+        writer.write(f"event: {event}\ndata: {data}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    # ---- Agent 调度 ----
+
+    async def _handle_run(self, writer: asyncio.StreamWriter, agent_type: str, body: bytes) -> None:
+        if agent_type not in AGENT_TYPES:
+            raise HTTPError(404, f"未知的 Agent 类型：{agent_type}")
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, "请求体不是合法的 JSON")
+        input_text = request.get("input")
+        if not input_text:
+            raise HTTPError(400, "缺少 input")
+        session_id = str(request.get("session_id") or "default")
+        stream = bool(request.get("stream"))
+
+        self.stats["requests"] += 1
+        session = self._admit(session_id)
+        start = time.perf_counter()
+        try:
+            async with session.lock:
+                agent = session.agents.get(agent_type)
+                if agent is None:
+                    agent = session.agents[agent_type] = create_agent(agent_type, self.llm_pool.get())
+                async with self._slots:
+                    if stream:
+                        await self._stream_run(writer, agent, agent_type, session_id, input_text, start)
+                    else:
+                        output = await self._run_in_worker(agent.run, input_text)
+                        latency = time.perf_counter() - start
+                        self._latencies.append(latency)
+                        await self._send_json(writer, 200, {
+                            "session_id": session_id,
+                            "agent": agent_type,
+                            "output": output,
+                            "latency_ms": round(latency * 1000, 2),
+                        })
+            self.stats["completed"] += 1
+        finally:
+            self._pending -= 1
+            session.pending -= 1
+
+    def _admit(self, session_id: str) -> Session:
+        """准入控制：排队已满时拒绝"""
+        if self._pending >= self.max_inflight + self.max_queue:
+            raise HTTPError(429, "服务繁忙，请稍后重试")
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session()
+            self._evict_sessions()
+        else:
+            self._sessions.move_to_end(session_id)
+        if session.pending >= self.session_queue:
+            raise HTTPError(429, "该会话的请求过多，请稍后重试")
+        self._pending += 1
+        session.pending += 1
+        return session
+
+    def _evict_sessions(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.pending:
+                break
+            del self._sessions[session_id]
+
+    async def _run_in_worker(self, func: Callable, *args):
+        """
+        在工作线程中执行并等待结果
+
+        请求被取消时仍然等待工作线程结束后再返回，调用方持有的会话锁
+        要到 Agent 真正停止运行后才释放，保证同一会话串行执行。
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    async def _stream_run(self, writer: asyncio.StreamWriter, agent: Agent, agent_type: str, session_id: str, input_text: str, start: float) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        try:
+            output = await self._stream_output(writer, agent, input_text)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # 响应头已经发出，不能再返回 500，改为推送 error 事件
+            await self._send_event(writer, "error", {"error": str(e)})
+            raise StreamAborted(str(e)) from e
+
+        latency = time.perf_counter() - start
+        self._latencies.append(latency)
+        await self._send_event(writer, "done", {
+            "session_id": session_id,
+            "agent": agent_type,
+            "output": output,
+            "latency_ms": round(latency * 1000, 2),
+        })
+
+    async def _stream_output(self, writer: asyncio.StreamWriter, agent: Agent, input_text: str) -> str:
+        """执行一次流式运行并返回完整输出，simple Agent 逐片段推送 chunk 事件"""
+        loop = asyncio.get_running_loop()
+
+        if isinstance(agent, MySimpleAgent):
+            queue: asyncio.Queue = asyncio.Queue()
+            disconnected = threading.Event()
+
+            def produce() -> None:
+                chunks = agent.stream_run(input_text)
+                try:
+                    for chunk in chunks:
+                        # 客户端断开后停止生成，本轮对话不写入历史
+                        if disconnected.is_set():
+                            return
+                        loop.call_soon_threadsafe(queue.put_nowait, ("chunk", chunk))
+                    loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, ("error", str(e)))
+                finally:
+                    chunks.close()
+
+            worker = asyncio.ensure_future(self._run_in_worker(produce))
+            output = ""
+            try:
+                while True:
+                    kind, value = await queue.get()
+                    if kind == "chunk":
+                        output += value
+                        await self._send_event(writer, "chunk", {"content": value})
+                    elif kind == "error":
+                        raise RuntimeError(value)
+                    else:
+                        break
+            finally:
+                # 发送失败（客户端断开）时也要等生成线程结束，再释放会话锁
+                disconnected.set()
+                await worker
+            return output
+        return await self._run_in_worker(agent.run, input_text)
+
+    def get_metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            **self.stats,
+            "pending": self._pending,
+            "sessions": len(self._sessions),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HelloAgents 异步 HTTP 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-inflight", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--session-queue", type=int, default=4)
+    parser.add_argument("--stub-llm", action="store_true", help="使用本地桩LLM，便于压测")
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.stub_llm:
+        llm_pool = LLMPool(lambda _: StubLLM(args.stub_latency))
+    else:
+        from dotenv import load_dotenv
+        from my_llm import MyLLM
+        load_dotenv()
+        llm_pool = LLMPool(lambda _: MyLLM())
+
+    server = AgentServer(llm_pool, args.max_inflight, args.max_queue, args.session_queue)
+
+    async def serve() -> None:
+        http_server = await server.start(args.host, args.port)
+        print(f"🚀 服务已启动：http://{args.host}:{args.port}")
+        async with http_server:
+            await http_server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
-import re
-from typing import Iterator, Optional
+import hashlib
+from typing import TYPE_CHECKING, Iterator, List, Optional
 from hello_agents import Config, HelloAgentsLLM, Message, SimpleAgent, ToolRegistry
+from my_budget import BudgetTracker, RunBudget
+from my_history import CompactHistory
+from my_profiler import profiled
+from my_tool_call_parser import ToolCall, parse_tool_calls, parse_tool_parameters, strip_tool_calls
+from my_tool_registry import ToolDescriptionCache, VersionedToolRegistry
+
+if TYPE_CHECKING:
+    from my_semantic_cache import SemanticAnswerCache
+
+
+def _is_tool_error(result: str) -> bool:
+    """工具调用结果是否为错误信息"""
+    body = result.split("\n", 1)[-1]
+    return result.startswith(("错误", "工具调用失败")) or body.startswith("错误")
 
 
 class MySimpleAgent(SimpleAgent):
@@ -11,22 +25,61 @@ class MySimpleAgent(SimpleAgent):
         system_prompt: Optional[str] = None,
         config: Optional[Config] = None,
         tool_registry: Optional['ToolRegistry'] = None,
-        enable_tool_calling: bool = True
+        enable_tool_calling: bool = True,
+        answer_cache: Optional['SemanticAnswerCache'] = None,
+        tool_description_top_k: Optional[int] = None,
+        budget: Optional[RunBudget] = None,
+        history_compress_min_bytes: Optional[int] = None
     ):
+        """
+        Args:
+            tool_description_top_k: 工具数超过该值时，提示词中只列出与用户输入最相关的 top_k 个工具
+            budget: 默认的单次运行预算，可在 run 时覆盖
+            history_compress_min_bytes: 指定后压缩超过该字节数的冷历史记录，默认不压缩
+        """
         super().__init__(name, llm, system_prompt, config)
+        # 使用固定容量的紧凑历史，容量取自 config.max_history_length
+        self._history = CompactHistory(
+            capacity=self.config.max_history_length, compress_min_bytes=history_compress_min_bytes
+        )
+        self.last_profile: Optional[dict] = None
         self.tool_registry = tool_registry
         self.enable_tool_calling = enable_tool_calling
+        self.answer_cache = answer_cache
+        self.tool_description_top_k = tool_description_top_k
+        self.budget = budget
+        self.last_run_stats: Optional[dict] = None
+        self._tool_failed = False
+        self._tool_descriptions = ToolDescriptionCache()
+        self._prompt_cache_key = None
+        self._prompt_cache = ""
         print(f"{name} 初始化完成，工具调用：{'启用' if enable_tool_calling else '禁用'}")
 
-    def run(self, input_text: str, max_tool_iterations: int = 3, **kwargs) -> str:
+    @profiled
+    def run(self, input_text: str, max_tool_iterations: int = 3, budget: Optional[RunBudget] = None, **kwargs) -> str:
         """
         重写的运行方法 - 实现简单对话逻辑，支持可选工具调用
+
+        budget 不传则使用初始化时的预算，预算用尽时停止工具调用循环并返回目前的结果
         """
+        tracker = BudgetTracker(budget or self.budget)
+        self._tool_failed = False
+
+        # 语义缓存只用于没有上下文的首轮提问，避免答案依赖历史对话
+        use_cache = self.answer_cache is not None and not self._history
+        if use_cache:
+            cache_namespace = self._cache_namespace()
+            cached_response = self.answer_cache.get(input_text, cache_namespace)
+            if cached_response is not None:
+                print(f"{self.name} 命中语义缓存")
+                self._save_turn(input_text, cached_response, tracker)
+                return cached_response
+
         # 构建消息列表
         messages = []
 
         # 添加系统消息（可能包含工具信息）
-        enhanced_system_prompt = self._get_enhanced_system_prompt()
+        enhanced_system_prompt = self._get_enhanced_system_prompt(input_text)
         messages.append({'role': 'system', 'content': enhanced_system_prompt})
             
         # 添加历史消息
@@ -38,16 +91,33 @@ class MySimpleAgent(SimpleAgent):
 
         # 如果没有启用工具调用，使用简单的对话逻辑
         if not self.enable_tool_calling:
-            response = self.llm.invoke(messages, **kwargs)
-            self.add_message(Message(input_text, "user"))
-            self.add_message(Message(response, "assistant"))
-            return response
+            response = tracker.invoke(self.llm, messages, **kwargs)
+            self._save_turn(input_text, response, tracker)
+        else:
+            # 启动工具调用
+            response = self._run_with_tools(messages, input_text, max_tool_iterations, tracker, **kwargs)
 
-        # 启动工具调用
-        return self._run_with_tools(messages, input_text, max_tool_iterations, **kwargs)
+        # 预算用尽的不完整回答和工具报错的回答不写入跨会话缓存
+        if use_cache and response and not tracker.stop_reason and not self._tool_failed:
+            self.answer_cache.put(input_text, response, cache_namespace)
+        return response
+
+    def _cache_namespace(self) -> str:
+        """语义缓存的命名空间：系统提示与可用工具不同的 Agent 不共享答案"""
+        tools = ""
+        if self.enable_tool_calling and self.tool_registry:
+            tools = ",".join(sorted(self.tool_registry.list_tools()))
+        key = f"{self.system_prompt or ''}\n{tools}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def _save_turn(self, input_text: str, response: str, tracker: BudgetTracker) -> None:
+        """保存本轮对话，回答消息的 metadata 中记录本次花费"""
+        self.last_run_stats = tracker.to_dict()
+        self.add_message(Message(input_text, "user"))
+        self.add_message(Message(response, "assistant", metadata={"budget": self.last_run_stats}))
     
-    def _get_enhanced_system_prompt(self) -> str:
-        """获取增强的系统提示，包含工具信息（如果启用）"""
+    def _get_enhanced_system_prompt(self, input_text: str = "") -> str:
+        """获取增强的系统提示，包含工具信息（如果启用），按工具描述缓存渲染结果"""
         base_prompt = self.system_prompt or "你是一个有用的AI助手。"
         
         # 未启动工具调用，直接返回基础提示
@@ -55,10 +125,17 @@ class MySimpleAgent(SimpleAgent):
             return base_prompt
         
         # 启用工具调用，添加工具信息
-        # 获取工具信息
-        tools_description = self.tool_registry.get_tools_description()
+        # 获取工具信息（按注册表版本缓存）
+        tools_description = self._tool_descriptions.describe(
+            self.tool_registry, input_text, self.tool_description_top_k
+        )
         if not tools_description or tools_description == '暂无可用工具':
             return base_prompt
+
+        # 工具描述与基础提示都未变化时直接复用上次渲染的结果
+        cache_key = (base_prompt, tools_description)
+        if cache_key == self._prompt_cache_key:
+            return self._prompt_cache
         
         tools_section = "\n\n## 可用工具\n"
         tools_section += "你可以使用以下工具来帮助回答问题：\n"
@@ -70,35 +147,43 @@ class MySimpleAgent(SimpleAgent):
         tools_section += "例如：`[TOOL_CALL:search:Python编程]` 或 `[TOOL_CALL:memory:recall=用户信息]`\n\n"
         tools_section += "工具调用结果会自动插入到对话中，然后你可以基于结果继续回答"
 
-        return base_prompt + tools_section
+        self._prompt_cache_key = cache_key
+        self._prompt_cache = base_prompt + tools_section
+        return self._prompt_cache
     
-    def _run_with_tools(self, messages: list, input_text: str, max_tool_iterations: int, **kwargs) -> str:
+    def _run_with_tools(self, messages: list, input_text: str, max_tool_iterations: int, tracker: Optional[BudgetTracker] = None, **kwargs) -> str:
         """支持工具调用的运行逻辑"""
-        
+        tracker = tracker or BudgetTracker()
         current_iteration = 0
         final_response = ""
+        partial_response = ""
 
         # iteration 循环
         while current_iteration < max_tool_iterations:
+            # 预算用尽时以最近一轮的回答与工具结果作为最终回答
+            if tracker.exhausted():
+                final_response = partial_response
+                break
             current_iteration += 1
 
             # 调用 LLM
-            response = self.llm.invoke(messages, **kwargs)
+            response = tracker.invoke(self.llm, messages, **kwargs)
 
             # 检查是否有工具调用
-            tool_calls = self._parse_tool_calls(response) # tool_calls: [{tool_name: xxx, parameters: yyy, original: }, {.. }]
+            tool_calls = self._parse_tool_calls(response)
 
             if tool_calls:
                 print(f"检测到 {len(tool_calls)} 个工具调用")
                 
                 tool_results = []
-                clean_response = response
-
                 for call in tool_calls:
-                    result = self._execute_tool_call(call['tool_name'], call['parameters'])
+                    result = self._execute_tool_call(call.name, call.parameters)
                     tool_results.append(result)
-                    # 从响应中移除工具调用
-                    clean_response = clean_response.replace(call['original'], "")
+                    if _is_tool_error(result):
+                        self._tool_failed = True
+
+                # 按解析出的区间一次性从响应中移除工具调用
+                clean_response = strip_tool_calls(response, tool_calls)
                 
                 # 构建包含工具结果的消息
                 messages.append({'role': 'assistant', 'content': clean_response})
@@ -106,6 +191,7 @@ class MySimpleAgent(SimpleAgent):
                 # 添加工具结果
                 tool_results_text = "\n\n".join(tool_results)
                 messages.append({'role': 'user', "content": f"工具执行结果：\n{tool_results_text}\n\n请基于这些结果给出完整的回答。"})
+                partial_response = "\n\n".join(part for part in (clean_response, tool_results_text) if part)
         
              # 没有工具调用，这是最终回答
             else:
@@ -114,28 +200,20 @@ class MySimpleAgent(SimpleAgent):
         
         # 如果超过最大迭代次数，获取最后一次回答
         if current_iteration >= max_tool_iterations and not final_response:
-            final_response = self.llm.invoke(messages, **kwargs)
+            if tracker.exhausted():
+                final_response = partial_response
+            else:
+                final_response = tracker.invoke(self.llm, messages, **kwargs)
 
         # 保存到历史纪录
-        self.add_message(Message(input_text, "user"))
-        self.add_message(Message(final_response, "assistant"))
+        self._save_turn(input_text, final_response, tracker)
         print(f"{self.name} 响应完成")
 
         return final_response
     
-    def _parse_tool_calls(self, text: str) -> list:
+    def _parse_tool_calls(self, text: str) -> List[ToolCall]:
         """解析文本中的工具调用"""
-        pattern = r"\[TOOL_CALL:([^:]+):([^\]]+)\]"
-        matches = re.findall(pattern, text)
-
-        tool_calls = []
-        for tool_name, parameters in matches:
-            tool_calls.append({
-                'tool_name': tool_name,
-                'parameters': parameters,
-                'original': f'[TOOL_CALL:{tool_name}:{parameters}]'
-            })
-        return tool_calls
+        return parse_tool_calls(text)
     
     def _execute_tool_call(self, tool_name: str, parameters: str) -> str:
         """执行工具调用"""
@@ -161,29 +239,7 @@ class MySimpleAgent(SimpleAgent):
 
     def _parse_tool_parameters(self, tool_name: str, parameters: str) -> dict:
         """智能解析工具参数"""
-
-        param_dict = {}
-
-        if '=' in parameters:
-            # key=value 一对
-            if ',' not in parameters:
-                key, value = parameters.split('=', 1)
-                param_dict[key.strip()] = value.strip()
-            else:
-                # key1=value1, key2=value2, ... 多对
-                pairs = parameters.split(',')
-                for pair in pairs:
-                    key, value = parameters.split('=', 1)
-                    param_dict[key.strip()] = value.strip()
-        else:
-            # 直接传入参数，根据工具类型智能推断
-            if tool_name == 'search':
-                param_dict = {'query': parameters}
-            elif tool_name == 'memory':
-                param_dict = {'action': 'search', 'query': parameters}
-            else:
-                param_dict = {'input': parameters}
-        return param_dict
+        return parse_tool_parameters(tool_name, parameters)
     
     def stream_run(self, input_text: str, **kwargs) -> Iterator[str]:
         """自定义的流式运行方法"""
@@ -216,8 +272,7 @@ class MySimpleAgent(SimpleAgent):
     def add_tool(self, tool) -> None:
         """添加工具到Agent（便利方法）"""
         if not self.tool_registry:
-            from hello_agents import ToolRegistry
-            self.tool_registry = ToolRegistry()
+            self.tool_registry = VersionedToolRegistry()
             self.enable_tool_calling = True
         
         self.tool_registry.register_tool(tool)
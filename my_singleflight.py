@@ -0,0 +1,202 @@
+"""请求合并 - 相同的并发LLM请求只向上游发起一次调用"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from hello_agents import HelloAgentsLLM
+
+
+def canonical_key(model: Optional[str], messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> str:
+    """根据模型、消息和调用参数生成规范化的请求键"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "kwargs": kwargs},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """进行中的非流式调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamCall:
+    """进行中的流式调用，缓存已收到的片段并分发给所有订阅者"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.listeners: List[Callable[[Optional[str]], None]] = []
+
+    def publish(self, chunk: str) -> None:
+        with self.cond:
+            self.chunks.append(chunk)
+            listeners = list(self.listeners)
+            self.cond.notify_all()
+        for listener in listeners:
+            listener(chunk)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self.cond:
+            self.done = True
+            self.error = error
+            listeners = list(self.listeners)
+            self.listeners.clear()
+            self.cond.notify_all()
+        for listener in listeners:
+            listener(None)
+
+    def iter_chunks(self) -> Iterator[str]:
+        """从头回放已有片段，然后阻塞等待新片段直到结束"""
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                pending = self.chunks[index:]
+                done = self.done
+                error = self.error
+            index += len(pending)
+            yield from pending
+            if done and index >= len(self.chunks):
+                if error:
+                    raise error
+                return
+
+    def subscribe(self, listener: Callable[[Optional[str]], None]) -> Tuple[List[str], bool]:
+        """返回已有片段快照；未结束时注册监听器，之后的片段与结束信号(None)通过监听器送达"""
+        with self.cond:
+            if not self.done:
+                self.listeners.append(listener)
+            return list(self.chunks), self.done
+
+
+class CoalescingLLM:
+    """
+    请求合并LLM
+
+    包装任意 HelloAgentsLLM（如 MyLLM），同一时刻规范化键相同的请求共享一次上游调用：
+    - invoke / stream_invoke 用于多线程场景
+    - ainvoke / astream_invoke 用于 asyncio 场景，同样与线程调用方合并
+    流式调用由后台线程读取上游，已到达的片段会回放给后加入的调用方。
+    请求结束后立即从表中移除，不会把结果当作缓存复用。
+    """
+
+    def __init__(self, llm: HelloAgentsLLM):
+        self.llm = llm
+        self.provider = getattr(llm, "provider", None)
+        self.model = getattr(llm, "model", None)
+
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.stats = {"upstream_calls": 0, "coalesced_calls": 0}
+
+    def invoke(self, messages: list[dict[str, str]], **kwargs) -> str:
+        """非流式调用，相同的并发请求共享结果"""
+        key = canonical_key(self.model, messages, kwargs)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["upstream_calls"] += 1
+            else:
+                self.stats["coalesced_calls"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self.llm.invoke(messages, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stream_invoke(self, messages: list[dict[str, str]], **kwargs) -> Iterator[str]:
+        """流式调用，相同的并发请求共享上游流"""
+        yield from self._join_stream(messages, kwargs).iter_chunks()
+
+    def think(self, messages: list[dict[str, str]], temperature: Optional[float] = None) -> Iterator[str]:
+        """流式调用，与 stream_invoke 一致"""
+        yield from self.stream_invoke(messages, temperature=temperature)
+
+    async def ainvoke(self, messages: list[dict[str, str]], **kwargs) -> str:
+        """asyncio 非流式调用"""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), canonical_key(self.model, messages, kwargs))
+        future = self._async_calls.get(key)
+        if future is None:
+            # 同一事件循环内直接合并，跨线程/事件循环的合并由 invoke 完成
+            future = loop.run_in_executor(None, functools.partial(self.invoke, messages, **kwargs))
+            self._async_calls[key] = future
+            future.add_done_callback(lambda _: self._async_calls.pop(key, None))
+        else:
+            with self._lock:
+                self.stats["coalesced_calls"] += 1
+        return await asyncio.shield(future)
+
+    async def astream_invoke(self, messages: list[dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """asyncio 流式调用"""
+        loop = asyncio.get_running_loop()
+        call = self._join_stream(messages, kwargs)
+        queue: asyncio.Queue = asyncio.Queue()
+        snapshot, done = call.subscribe(lambda chunk: loop.call_soon_threadsafe(queue.put_nowait, chunk))
+
+        for chunk in snapshot:
+            yield chunk
+        if not done:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+        if call.error:
+            raise call.error
+
+    def _join_stream(self, messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> _StreamCall:
+        """加入进行中的流式调用，没有时启动后台线程读取上游"""
+        key = canonical_key(self.model, messages, kwargs)
+        with self._lock:
+            call = self._streams.get(key)
+            if call is not None:
+                self.stats["coalesced_calls"] += 1
+                return call
+            call = self._streams[key] = _StreamCall()
+            self.stats["upstream_calls"] += 1
+
+        threading.Thread(target=self._pump, args=(key, call, messages, kwargs), daemon=True).start()
+        return call
+
+    def _pump(self, key: str, call: _StreamCall, messages: list[dict[str, str]], kwargs: Dict[str, Any]) -> None:
+        error = None
+        try:
+            for chunk in self.llm.stream_invoke(messages, **kwargs):
+                call.publish(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            call.finish(error)
@@ -0,0 +1,182 @@
+"""工具调用解析 - MySimpleAgent 与 MyReActAgent 共用的单遍扫描器"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# [TOOL_CALL:tool_name:parameters] 的起始部分，参数由括号配对扫描确定结束位置
+_TOOL_CALL_START = re.compile(r"\[TOOL_CALL:([^:\[\]\n]+):")
+# ReAct 行动：tool_name[tool_input]
+_ACTION_START = re.compile(r"\s*(\w+)\[")
+_THOUGHT_LINE = re.compile(r"Thought: (.*)")
+_ACTION_LINE = re.compile(r"Action: (.*)")
+
+_OPENING = {"[": "]", "(": ")", "{": "}"}
+_CLOSING = {"]", ")", "}"}
+_QUOTES = {'"', "'"}
+_SPECIAL = re.compile(r"[\[\](){}\"']")
+# 引号只有出现在值的开头（参数开头、'=' 或 ',' 之后）时才视为字符串起始
+_VALUE_START = {"=", ","}
+
+
+@dataclass
+class ToolCall:
+    """解析出的工具调用，start / end 为在原文中的区间 text[start:end]"""
+
+    name: str
+    parameters: str
+    start: int
+    end: int
+
+
+def _opens_value(text: str, i: int, start: int) -> bool:
+    """text[i] 处的引号是否位于值的开头，单词内的撇号（如 don't）不算"""
+    while i > start and text[i - 1] in " \t":
+        i -= 1
+    return i == start or text[i - 1] in _VALUE_START
+
+
+def _find_closing(text: str, pos: int, quote_aware: bool = True) -> int:
+    """
+    从 pos 开始查找与已打开的 '[' 配对的 ']'，返回其下标，找不到返回 -1
+
+    支持嵌套括号；quote_aware 时值开头的引号内的括号不参与配对。
+    只在括号和引号处停留，普通字符由正则引擎跳过。
+    """
+    stack = ["]"]
+    quote = None
+    for match in _SPECIAL.finditer(text, pos):
+        ch = match.group()
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in _QUOTES:
+            if quote_aware and _opens_value(text, match.start(), pos):
+                quote = ch
+        elif ch in _OPENING:
+            stack.append(_OPENING[ch])
+        else:
+            if ch != stack[-1]:
+                # 括号不匹配时只接受外层 ']'，其余忽略
+                if ch != "]":
+                    continue
+                while stack[-1] != "]":
+                    stack.pop()
+            stack.pop()
+            if not stack:
+                return match.start()
+    if quote_aware:
+        # 引号未闭合，退化为不区分引号再扫描一次
+        return _find_closing(text, pos, quote_aware=False)
+    return -1
+
+
+def parse_tool_calls(text: str) -> List[ToolCall]:
+    """单遍解析文本中的所有 [TOOL_CALL:name:parameters]"""
+    calls = []
+    pos = 0
+    while True:
+        match = _TOOL_CALL_START.search(text, pos)
+        if not match:
+            break
+        close = _find_closing(text, match.end())
+        if close < 0:
+            break
+        parameters = text[match.end():close]
+        if parameters:
+            calls.append(ToolCall(match.group(1).strip(), parameters, match.start(), close + 1))
+        pos = close + 1
+    return calls
+
+
+def strip_tool_calls(text: str, calls: List[ToolCall]) -> str:
+    """按区间一次性移除所有工具调用，calls 须按出现顺序排列"""
+    if not calls:
+        return text
+    parts = []
+    pos = 0
+    for call in calls:
+        parts.append(text[pos:call.start])
+        pos = call.end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _split_top_level(parameters: str, sep: str) -> List[str]:
+    """按顶层分隔符切分，忽略引号和括号内的分隔符"""
+    parts = []
+    depth = 0
+    quote = None
+    last = 0
+    for i, ch in enumerate(parameters):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in _QUOTES:
+            if _opens_value(parameters, i, 0):
+                quote = ch
+        elif ch in _OPENING:
+            depth += 1
+        elif ch in _CLOSING:
+            depth = max(depth - 1, 0)
+        elif ch == sep and depth == 0:
+            parts.append(parameters[last:i])
+            last = i + 1
+    parts.append(parameters[last:])
+    return parts
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in _QUOTES:
+        return value[1:-1]
+    return value
+
+
+def parse_tool_parameters(tool_name: str, parameters: str) -> Dict[str, str]:
+    """
+    解析工具参数
+
+    - key=value 或 key1=value1, key2="含,逗号的值" 解析为字典
+    - 否则按工具类型推断参数名
+    """
+    pairs = _split_top_level(parameters, ",")
+    if all("=" in pair for pair in pairs):
+        param_dict = {}
+        for pair in pairs:
+            key, value = pair.split("=", 1)
+            param_dict[key.strip()] = _unquote(value)
+        return param_dict
+
+    # 直接传入参数，根据工具类型智能推断
+    if tool_name == 'search':
+        return {'query': parameters}
+    if tool_name == 'memory':
+        return {'action': 'search', 'query': parameters}
+    return {'input': parameters}
+
+
+def parse_action(action_text: str) -> Optional[ToolCall]:
+    """
+    解析 ReAct 行动 tool_name[tool_input]，支持输入中的嵌套括号
+
+    输入中的括号不配对（如 Finish[区间为 [1, 2)]）时以最后一个 ']' 作为结束。
+    """
+    match = _ACTION_START.match(action_text)
+    if not match:
+        return None
+    close = _find_closing(action_text, match.end())
+    if close < 0:
+        close = action_text.rfind("]")
+        if close < match.end():
+            return None
+    return ToolCall(match.group(1), action_text[match.end():close], match.start(1), close + 1)
+
+
+def parse_react_output(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """解析 ReAct 输出中的 Thought 与 Action"""
+    thought_match = _THOUGHT_LINE.search(text)
+    action_match = _ACTION_LINE.search(text)
+    thought = thought_match.group(1).strip() if thought_match else None
+    action = action_match.group(1).strip() if action_match else None
+    return thought, action
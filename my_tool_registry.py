@@ -0,0 +1,128 @@
+"""带版本号的工具注册表与工具描述缓存"""
+
+import math
+import re
+from typing import Any, Callable, Hashable, List, Optional, Set, Tuple
+from hello_agents import ToolRegistry
+from hello_agents.tools.base import Tool
+
+_ASCII_WORD = re.compile(r"[a-z0-9_]+")
+_CJK_RUN = re.compile(r"[一-鿿]+")
+
+
+class VersionedToolRegistry(ToolRegistry):
+    """
+    带版本号的工具注册表
+
+    每次注册、注销或清空工具时 version 加一，Agent 可以据此缓存由工具列表渲染出的提示词。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.version = 0
+
+    def register_tool(self, tool: Tool):
+        super().register_tool(tool)
+        self.version += 1
+
+    def register_function(self, name: str, description: str, func: Callable[[str], str]):
+        super().register_function(name, description, func)
+        self.version += 1
+
+    def unregister(self, name: str):
+        super().unregister(name)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+
+def registry_version(registry: ToolRegistry) -> Hashable:
+    """
+    获取注册表的版本标识
+
+    VersionedToolRegistry 直接使用 version；普通 ToolRegistry 退化为工具名称列表，
+    同样能反映工具的增删。
+    """
+    version = getattr(registry, "version", None)
+    if version is not None:
+        return version
+    return tuple(registry.list_tools())
+
+
+def describe_tools(registry: ToolRegistry) -> List[Tuple[str, str]]:
+    """返回 [(工具名, "- 工具名: 描述"), ...]，顺序与 get_tools_description 一致"""
+    entries = []
+    for tool in getattr(registry, "_tools", {}).values():
+        entries.append((tool.name, f"- {tool.name}: {tool.description}"))
+    for name, info in getattr(registry, "_functions", {}).items():
+        entries.append((name, f"- {name}: {info['description']}"))
+    return entries
+
+
+def _lexical_terms(text: str) -> set:
+    """提取用于词法匹配的词项：英文/数字单词与中文字符二元组"""
+    text = text.lower()
+    terms = set(_ASCII_WORD.findall(text))
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def rank_tools(
+    entries: List[Tuple[str, str]],
+    query: str,
+    top_k: int,
+    term_sets: Optional[List[Set[str]]] = None
+) -> List[Tuple[str, str]]:
+    """
+    按与 query 的词法相关度选出 top_k 个工具，保持原有顺序输出
+
+    得分为共有词项数除以工具描述词项数的平方根，query 中直接出现工具名时优先。
+    term_sets 为预先提取的各工具描述词项，未提供时现场提取。
+    """
+    if term_sets is None:
+        term_sets = [_lexical_terms(line) for _, line in entries]
+    query_lower = query.lower()
+    query_terms = _lexical_terms(query)
+    scored = []
+    for index, ((name, _), terms) in enumerate(zip(entries, term_sets)):
+        score = len(query_terms & terms) / math.sqrt(len(terms) or 1)
+        if name.lower() in query_lower:
+            score += 10.0
+        scored.append((-score, index))
+    selected = sorted(index for _, index in sorted(scored)[:top_k])
+    return [entries[index] for index in selected]
+
+
+class ToolDescriptionCache:
+    """
+    工具描述缓存
+
+    以注册表版本为键缓存工具描述；指定 top_k 且工具数超过 top_k 时，
+    只输出与用户输入最相关的 top_k 个工具，减少大型注册表占用的提示词 token。
+    工具描述的词项同样按版本缓存，每次调用只需提取用户输入的词项。
+    """
+
+    def __init__(self):
+        self._key: Any = None
+        self._entries: List[Tuple[str, str]] = []
+        self._term_sets: Optional[List[Set[str]]] = None
+        self._description = ""
+
+    def describe(self, registry: ToolRegistry, query: str = "", top_k: Optional[int] = None) -> str:
+        key = (id(registry), registry_version(registry))
+        if key != self._key:
+            self._key = key
+            self._entries = describe_tools(registry)
+            self._term_sets = None
+            self._description = "\n".join(line for _, line in self._entries) if self._entries else "暂无可用工具"
+
+        if top_k and len(self._entries) > top_k:
+            if self._term_sets is None:
+                self._term_sets = [_lexical_terms(line) for _, line in self._entries]
+            return "\n".join(line for _, line in rank_tools(self._entries, query, top_k, self._term_sets))
+        return self._description
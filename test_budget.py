@@ -0,0 +1,140 @@
+import tempfile
+from hello_agents import ToolRegistry
+from fake_llm import ScriptedLLM
+from my_budget import BudgetTracker, RunBudget, estimate_tokens
+from my_cascade import CascadeLLM
+from my_checkpoint import CheckpointStore
+from my_plan_solve_agent import MyPlanAndSolveAgent
+from my_react_agent import MyReActAgent
+from my_reflection_agent import MyReflectionAgent
+from my_semantic_cache import SemanticAnswerCache
+from my_simple_agent import MySimpleAgent
+
+
+def test_tracker_counts_and_stops():
+    """首次调用前不会判定用尽，达到任一上限后记录停止原因"""
+    tracker = BudgetTracker(RunBudget(max_tokens=10))
+    assert not tracker.exhausted()
+    tracker.invoke(ScriptedLLM(["十个汉字组成的回答内容"]), [{"role": "user", "content": "hi"}])
+    assert tracker.completion_tokens == estimate_tokens("十个汉字组成的回答内容") == 11
+    assert tracker.exhausted()
+    assert tracker.to_dict()["stop_reason"] == "max_tokens"
+
+
+def test_tracker_counts_cascade_escalation():
+    """级联升级时两次上游调用都计入调用次数与 token 数"""
+    cascade = CascadeLLM(ScriptedLLM(["我不确定"]), ScriptedLLM(["答案是四十二"]))
+    tracker = BudgetTracker(RunBudget(max_llm_calls=1))
+    messages = [{"role": "user", "content": "问题"}]
+    assert tracker.invoke(cascade, messages) == "答案是四十二"
+    assert tracker.llm_calls == 2
+    assert tracker.prompt_tokens == 2 * estimate_tokens("问题")
+    assert tracker.completion_tokens == estimate_tokens("我不确定") + estimate_tokens("答案是四十二")
+    assert tracker.exhausted()
+
+    cascade = CascadeLLM(ScriptedLLM(["答案"]), ScriptedLLM([]))
+    tracker = BudgetTracker()
+    tracker.invoke(cascade, messages)
+    assert tracker.llm_calls == 1
+
+
+def test_reflection_returns_best_draft():
+    """反思达到最大迭代次数或预算用尽时返回最新一版回答，而不是失败提示"""
+    llm = ScriptedLLM(["初稿", "有问题", "第二稿"])
+    agent = MyReflectionAgent(name="反思", llm=llm, max_iterations=1)
+    assert agent.run("任务") == "第二稿"
+
+    llm = ScriptedLLM(["初稿", "有问题", "第二稿"])
+    agent = MyReflectionAgent(name="反思", llm=llm, max_iterations=3)
+    assert agent.run("任务", budget=RunBudget(max_llm_calls=2)) == "初稿"
+    assert llm.calls == 2
+    assert agent.last_run_stats["stop_reason"] == "max_llm_calls"
+    assert agent.get_history()[-1].metadata["budget"]["llm_calls"] == 2
+
+
+def test_react_stops_on_wall_time():
+    """ReAct 超出耗时预算后停止，返回最近一次观察结果"""
+    registry = ToolRegistry()
+    registry.register_function("echo", "回显输入", lambda text: f"echo:{text}")
+    llm = ScriptedLLM(["Thought: 查一下\nAction: echo[hello]"], latency=0.05)
+    agent = MyReActAgent(name="ReAct", llm=llm, tool_registry=registry, max_steps=10, budget=RunBudget(max_wall_time=0.12))
+    assert agent.run("问题") == "echo:hello"
+    assert llm.calls < 10
+    assert agent.last_run_stats["stop_reason"] == "max_wall_time"
+
+
+def test_react_skips_tool_error_observation():
+    """工具报错的观察结果和思考都不会作为提前停止时的答案"""
+    llm = ScriptedLLM(["Thought: 查一下天气\nAction: weather[北京]"])
+    agent = MyReActAgent(name="ReAct", llm=llm, tool_registry=ToolRegistry(), budget=RunBudget(max_llm_calls=1))
+    assert agent.run("北京天气") == "抱歉，我无法在限定步数内完成这个任务。"
+
+
+def test_react_max_steps_without_observation():
+    """达到最大步数且没有可用的观察结果时返回失败提示，resume 也返回同样的提示"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        llm = ScriptedLLM(["Thought: 我需要调用计算器"])
+        agent = MyReActAgent(name="ReAct", llm=llm, tool_registry=ToolRegistry(), max_steps=2, checkpoint_store=store)
+        failure = "抱歉，我无法在限定步数内完成这个任务。"
+        assert agent.run("1+1", run_id="steps-run") == failure
+        assert llm.calls == 2
+        assert store.load("steps-run")["answer"] == failure
+        assert agent.resume("steps-run") == failure
+
+
+def test_plan_and_solve_budget():
+    """Plan-and-Solve 预算用尽时返回最后一个已完成步骤的结果，且可以 resume 继续"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        plan_text = '```python\n["步骤A", "步骤B", "步骤C"]\n```'
+        llm = ScriptedLLM([plan_text, "结果A", "结果B", "结果C"])
+        agent = MyPlanAndSolveAgent(name="规划", llm=llm, checkpoint_store=store)
+        assert agent.run("问题", run_id="budget-run", budget=RunBudget(max_llm_calls=2)) == "结果A"
+        assert llm.calls == 2
+        assert agent.last_run_stats["stop_reason"] == "max_llm_calls"
+        assert agent.get_history()[-1].metadata["budget"]["llm_calls"] == 2
+        assert not store.load("budget-run")["finished"]
+
+        assert agent.resume("budget-run") == "结果C"
+        assert llm.calls == 4
+
+
+def test_simple_agent_skips_final_call_when_exhausted():
+    """工具循环中预算用尽时不再追加调用，以最近一轮的工具结果作为回答"""
+    registry = ToolRegistry()
+    registry.register_function("calculator", "计算", lambda expression: "4")
+    llm = ScriptedLLM(["先算一下[TOOL_CALL:calculator:2+2]"])
+    agent = MySimpleAgent(name="简单", llm=llm, tool_registry=registry)
+    response = agent.run("2+2等于几", budget=RunBudget(max_llm_calls=1))
+    assert llm.calls == 1
+    assert response.startswith("先算一下")
+    assert "4" in response
+    assert agent.last_run_stats["llm_calls"] == 1
+
+
+def test_partial_answer_not_cached():
+    """预算用尽的不完整回答不写入语义缓存"""
+    registry = ToolRegistry()
+    registry.register_function("calculator", "计算", lambda expression: "4")
+    cache = SemanticAnswerCache(capacity=8)
+    agent = MySimpleAgent(name="简单", llm=ScriptedLLM(["先算一下[TOOL_CALL:calculator:2+2]"]), tool_registry=registry, answer_cache=cache)
+    agent.run("2+2等于几", budget=RunBudget(max_llm_calls=1))
+    assert len(cache) == 0
+
+    # 工具报错时的回答同样不缓存
+    agent = MySimpleAgent(name="简单", llm=ScriptedLLM(["[TOOL_CALL:missing:x]", "无法计算"]), tool_registry=registry, answer_cache=cache)
+    assert agent.run("3+3等于几") == "无法计算"
+    assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    test_tracker_counts_and_stops()
+    test_tracker_counts_cascade_escalation()
+    test_reflection_returns_best_draft()
+    test_react_stops_on_wall_time()
+    test_react_skips_tool_error_observation()
+    test_react_max_steps_without_observation()
+    test_plan_and_solve_budget()
+    test_simple_agent_skips_final_call_when_exhausted()
+    test_partial_answer_not_cached()
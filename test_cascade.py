@@ -0,0 +1,64 @@
+from fake_llm import ScriptedLLM
+from my_cascade import CascadeLLM
+from my_plan_solve_agent import MyPlanAndSolveAgent
+from my_reflection_agent import MyReflectionAgent
+
+
+def test_small_model_answers():
+    """小模型输出合格时不升级"""
+    small = ScriptedLLM(model="small", responses=["无需改进"])
+    large = ScriptedLLM(model="large", responses=[])
+    cascade = CascadeLLM(small, large, role="reflect")
+
+    assert cascade.invoke([{"role": "user", "content": "hi"}]) == "无需改进"
+    stats = cascade.get_stats()
+    assert stats["calls"] == 1
+    assert stats["escalations"] == 0
+    assert large.calls == 0
+
+
+def test_escalation_reasons():
+    """空输出、异常和不确定表述都会升级到大模型"""
+    small = ScriptedLLM(model="small", responses=["", RuntimeError("超时"), "我不确定答案"])
+    large = ScriptedLLM(model="large", responses=["答案1", "答案2", "答案3"])
+    cascade = CascadeLLM(small, large, role="initial")
+
+    for expected in ["答案1", "答案2", "答案3"]:
+        assert cascade.invoke([{"role": "user", "content": "hi"}]) == expected
+
+    stats = cascade.get_stats()
+    assert stats["escalation_rate"] == 1.0
+    assert stats["escalation_reasons"] == {"empty": 1, "error": 1, "uncertain": 1}
+
+
+def test_planner_escalates_on_parse_failure():
+    """小模型计划无法解析时，规划器升级到大模型"""
+    small = ScriptedLLM(model="small", responses=["我会先算周一，再算周二"])
+    large = ScriptedLLM(model="large", responses=['```python\n["步骤1"]\n```'])
+    executor_llm = ScriptedLLM(model="executor", responses=["42"])
+    agent = MyPlanAndSolveAgent(
+        name="级联测试",
+        llm=executor_llm,
+        role_llms={"planner": CascadeLLM(small, large, role="planner")}
+    )
+
+    assert agent.run("问题") == "42"
+    stats = agent.get_role_stats()
+    assert stats["planner"]["escalation_reasons"] == {"invalid": 1}
+
+
+def test_reflection_roles():
+    """反思智能体按角色选择LLM"""
+    main_llm = ScriptedLLM(model="main", responses=["初稿"])
+    reflect_llm = CascadeLLM(ScriptedLLM(model="small", responses=["无需改进"]), ScriptedLLM(model="large", responses=[]), role="reflect")
+    agent = MyReflectionAgent(name="级联测试", llm=main_llm, role_llms={"reflect": reflect_llm})
+
+    assert agent.run("任务") == "初稿"
+    assert agent.get_role_stats()["reflect"]["calls"] == 1
+
+
+if __name__ == "__main__":
+    test_small_model_answers()
+    test_escalation_reasons()
+    test_planner_escalates_on_parse_failure()
+    test_reflection_roles()
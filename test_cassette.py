@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from my_cassette import Cassette
+from my_llm import MyLLM
+from my_reflection_agent import MyReflectionAgent
+
+
+class FakeCompletions:
+    """模拟 OpenAI chat.completions 接口"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, stream=False, **kwargs):
+        self.calls += 1
+        content = f"第{self.calls}次响应：{messages[-1]['content']}"
+        if stream:
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 3]))])
+                for i in range(0, len(content), 3)
+            ])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def recording_llm(path):
+    llm = MyLLM(provider="modelscope", api_key="test-key", cassette=Cassette(path, mode="record"))
+    completions = FakeCompletions()
+    llm._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return llm, completions
+
+
+def test_record_and_replay_invoke():
+    """录制的响应在回放时按顺序返回，回放不需要API密钥"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.jsonl")
+        llm, completions = recording_llm(path)
+        messages = [{"role": "user", "content": "你好"}]
+        first = llm.invoke(messages, temperature=0.1)
+        second = llm.invoke(messages, temperature=0.1)
+        assert completions.calls == 2
+
+        replay = MyLLM(cassette=Cassette(path, mode="replay"))
+        assert replay.invoke(messages, temperature=0.1) == first
+        assert replay.invoke(messages, temperature=0.1) == second
+        # 录制条目用完后重复最后一条
+        assert replay.invoke(messages, temperature=0.1) == second
+
+
+def test_record_and_replay_stream():
+    """流式片段与时间偏移被录制，实时回放时保持原有节奏"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stream.jsonl")
+        llm, _ = recording_llm(path)
+        messages = [{"role": "user", "content": "讲个故事"}]
+        recorded = list(llm.stream_invoke(messages))
+
+        fast = MyLLM(cassette=Cassette(path, mode="replay"))
+        assert list(fast.stream_invoke(messages)) == recorded
+
+        # 把最后一个片段的时间偏移改为 0.2 秒，实时回放应当等待
+        with open(path, encoding="utf-8") as f:
+            entry = json.loads(f.readline())
+        entry["chunks"][-1][0] = 0.2
+        slow_path = os.path.join(tmp, "slow.jsonl")
+        with open(slow_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        slow = MyLLM(cassette=Cassette(slow_path, mode="replay", realtime=True))
+        start = time.perf_counter()
+        assert list(slow.stream_invoke(messages)) == recorded
+        assert time.perf_counter() - start >= 0.2
+
+
+def test_torn_write_keeps_later_records():
+    """录制中断留下的半行不影响之后追加的交互"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "torn.jsonl")
+        llm, _ = recording_llm(path)
+        first = llm.invoke([{"role": "user", "content": "第一个问题"}])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"key":"abc","type":"inv')
+
+        llm, _ = recording_llm(path)
+        second = llm.invoke([{"role": "user", "content": "第二个问题"}])
+
+        replay = MyLLM(cassette=Cassette(path, mode="replay"))
+        assert replay.invoke([{"role": "user", "content": "第一个问题"}]) == first
+        assert replay.invoke([{"role": "user", "content": "第二个问题"}]) == second
+
+
+def test_replay_agent_run():
+    """整个 Agent 运行可以离线重放"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "agent.jsonl")
+        llm, _ = recording_llm(path)
+        recorded = MyReflectionAgent(name="录制", llm=llm, max_iterations=1).run("写一首诗")
+
+        replay_llm = MyLLM(cassette=Cassette(path, mode="replay"))
+        assert MyReflectionAgent(name="回放", llm=replay_llm, max_iterations=1).run("写一首诗") == recorded
+
+
+if __name__ == "__main__":
+    test_record_and_replay_invoke()
+    test_record_and_replay_stream()
+    test_torn_write_keeps_later_records()
+    test_replay_agent_run()
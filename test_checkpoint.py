@@ -0,0 +1,95 @@
+import tempfile
+from hello_agents import ToolRegistry
+from fake_llm import ScriptedLLM
+from my_checkpoint import CheckpointStore
+from my_plan_solve_agent import MyPlanAndSolveAgent
+from my_react_agent import MyReActAgent
+
+
+def test_plan_and_solve_resume():
+    """计划执行到一半失败后，resume 只补跑剩余步骤"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        plan_text = '```python\n["步骤A", "步骤B", "步骤C"]\n```'
+        llm = ScriptedLLM([plan_text, "结果A", "结果B", RuntimeError("模拟LLM调用失败")])
+        agent = MyPlanAndSolveAgent(name="检查点测试", llm=llm, checkpoint_store=store)
+
+        try:
+            agent.run("问题", run_id="ps-run")
+            assert False, "第4次调用应当失败"
+        except RuntimeError:
+            pass
+
+        state = store.load("ps-run")
+        assert state["plan"] == ["步骤A", "步骤B", "步骤C"]
+        assert state["results"] == ["结果A", "结果B"]
+
+        # 恢复后只需要一次LLM调用
+        llm.responses = ["结果C"]
+        llm.calls = 0
+        result = agent.resume("ps-run")
+        assert result == "结果C"
+        assert llm.calls == 1
+
+        # 已完成的运行直接返回结果，不再调用LLM
+        assert agent.resume("ps-run") == "结果C"
+        assert llm.calls == 1
+
+
+def test_react_resume():
+    """ReAct 失败后从检查点恢复 current_history"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        registry = ToolRegistry()
+        registry.register_function("echo", "回显输入", lambda text: f"echo:{text}")
+        llm = ScriptedLLM(["Thought: 先查询\nAction: echo[你好]", RuntimeError("模拟LLM调用失败")])
+        agent = MyReActAgent(name="检查点测试", llm=llm, tool_registry=registry, checkpoint_store=store)
+
+        try:
+            agent.run("问题", run_id="react-run")
+            assert False, "第2次调用应当失败"
+        except RuntimeError:
+            pass
+
+        llm.responses = ["Thought: 已经足够\nAction: Finish[完成]"]
+        llm.calls = 0
+        result = agent.resume("react-run")
+        assert result == "完成"
+        assert llm.calls == 1
+        assert "Observation: echo:你好" in agent.current_history
+
+        # 其他类型 Agent 的运行不能被恢复，也不会写入记录
+        planner = MyPlanAndSolveAgent(name="检查点测试", llm=ScriptedLLM(), checkpoint_store=store)
+        with open(store._path("react-run"), encoding="utf-8") as f:
+            records = f.read()
+        try:
+            planner.resume("react-run")
+            assert False, "Agent 类型不匹配时应当报错"
+        except ValueError:
+            pass
+        with open(store._path("react-run"), encoding="utf-8") as f:
+            assert f.read() == records
+
+
+def test_truncated_checkpoint():
+    """最后一行写入不完整时忽略该行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        store.append("run", {"type": "start", "agent": "plan_and_solve", "input": "问题"})
+        store.append("run", {"type": "plan", "plan": ["a", "b"]})
+        with open(store._path("run"), "a", encoding="utf-8") as f:
+            f.write('{"type":"step","ind')
+        state = store.load("run")
+        assert state["plan"] == ["a", "b"]
+        assert state["results"] == []
+
+        # 恢复运行后追加的记录不会被不完整的行吞掉
+        store.append("run", {"type": "step", "index": 1, "step": "a", "result": "ra"})
+        store.append("run", {"type": "step", "index": 2, "step": "b", "result": "rb"})
+        assert store.load("run")["results"] == ["ra", "rb"]
+
+
+if __name__ == "__main__":
+    test_plan_and_solve_resume()
+    test_react_resume()
+    test_truncated_checkpoint()
@@ -0,0 +1,75 @@
+from fake_llm import ScriptedLLM
+from hello_agents import Config, Message
+from my_history import CompactHistory
+from my_simple_agent import MySimpleAgent
+
+
+def test_ring_buffer_capacity():
+    """超出容量后丢弃最旧的记录"""
+    history = CompactHistory(capacity=3)
+    for i in range(5):
+        history.append(Message(f"消息{i}", "user"))
+
+    assert len(history) == 3
+    assert [record.content for record in history] == ["消息2", "消息3", "消息4"]
+    assert history[-1].content == "消息4"
+
+
+def test_cold_turns_compressed():
+    """离开热区的长消息被压缩，读取时透明解压"""
+    history = CompactHistory(capacity=10, hot_turns=2, compress_min_bytes=64)
+    long_text = "很长的回答内容。" * 50
+    for _ in range(4):
+        history.append(Message(long_text, "assistant"))
+
+    assert history[0].compressed
+    assert not history[-1].compressed
+    assert history[0].content == long_text
+    assert history[0].role is history[-1].role
+
+
+def test_compression_is_opt_in():
+    """默认不压缩，Agent 通过 history_compress_min_bytes 开启"""
+    history = CompactHistory(capacity=10, hot_turns=0)
+    history.append(Message("很长的回答内容。" * 50, "assistant"))
+    assert not history[0].compressed
+
+    agent = MySimpleAgent(name="历史测试", llm=ScriptedLLM([lambda messages: f"回复：{messages[-1]['content']}"]), enable_tool_calling=False, history_compress_min_bytes=64)
+    assert agent._history.compress_min_bytes == 64
+
+
+def test_copy_returns_messages():
+    """copy 返回 Message 列表并保留元数据"""
+    history = CompactHistory()
+    history.append(Message("你好", "user", metadata={"tenant": "a"}))
+
+    messages = history.copy()
+    assert isinstance(messages[0], Message)
+    assert messages[0].content == "你好"
+    assert messages[0].metadata == {"tenant": "a"}
+
+
+def test_agent_history_is_bounded():
+    """Agent 的历史容量取自 config.max_history_length"""
+    agent = MySimpleAgent(
+        name="历史测试",
+        llm=ScriptedLLM([lambda messages: f"回复：{messages[-1]['content']}"]),
+        config=Config(max_history_length=4),
+        enable_tool_calling=False
+    )
+    for i in range(5):
+        agent.run(f"问题{i}")
+
+    history = agent.get_history()
+    assert len(history) == 4
+    assert history[0].content == "问题3"
+    agent.clear_history()
+    assert agent.get_history() == []
+
+
+if __name__ == "__main__":
+    test_ring_buffer_capacity()
+    test_cold_turns_compressed()
+    test_compression_is_opt_in()
+    test_copy_returns_messages()
+    test_agent_history_is_bounded()
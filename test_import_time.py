@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+from my_llm import MyLLM
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module: str) -> dict:
+    """用 python -X importtime 导入模块，返回 {模块名: 累计导入耗时(微秒)}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_calculator_import_is_light():
+    """导入计算器模块不应连带导入 hello_agents 和 openai"""
+    times = import_times("my_calculator_tool")
+    print(f"my_calculator_tool 导入耗时: {times['my_calculator_tool'] / 1000:.1f} ms")
+    assert "hello_agents" not in times
+    assert "openai" not in times
+
+
+def test_llm_client_is_lazy():
+    """构造 MyLLM 时不创建客户端，首次访问时才创建"""
+    llm = MyLLM(provider="modelscope", api_key="test-key")
+    assert llm.__dict__["_lazy_client"] is None
+
+    client = llm._client
+    assert client is not None
+    assert llm._client is client
+
+
+if __name__ == "__main__":
+    test_calculator_import_is_light()
+    test_llm_client_is_lazy()
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from hello_agents import ToolRegistry
+from hello_agents.tools.base import Tool
+from fake_llm import ScriptedLLM
+from my_profiler import RunProfiler
+from my_reflection_agent import MyReflectionAgent
+from my_simple_agent import MySimpleAgent
+
+
+class SlowTool(Tool):
+    """休眠 0.2 秒的工具"""
+
+    def __init__(self):
+        super().__init__("slow", "耗时工具")
+
+    def run(self, parameters):
+        time.sleep(0.2)
+        return "ok"
+
+    def get_parameters(self):
+        return []
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_agent() -> MySimpleAgent:
+    registry = ToolRegistry()
+    registry.register_tool(SlowTool())
+    return MySimpleAgent(name="剖析", llm=ScriptedLLM(["[TOOL_CALL:slow:x]", "完成"], latency=0.2), tool_registry=registry)
+
+
+def test_profile_attributes_phases_and_exports():
+    """一次运行的耗时按 LLM / 工具 / 本地 CPU 拆分，并按 run_id 导出火焰图文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["AGENT_PROFILE_DIR"] = tmp
+        try:
+            agent = make_agent()
+            assert agent.run("测试", profile=True) == "完成"
+        finally:
+            del os.environ["AGENT_PROFILE_DIR"]
+
+        report = agent.last_profile
+        assert report["backend"] == "sampling"
+        assert report["samples"] > 0
+        # 两次 LLM 调用各 0.2 秒，一次工具调用 0.2 秒
+        assert 0.3 < report["llm_time"] < 0.5
+        assert 0.1 < report["tool_time"] < 0.3
+
+        collapsed_path, speedscope_path = report["files"]
+        assert os.path.basename(collapsed_path) == f"{report['run_id']}.collapsed"
+        with open(collapsed_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert any(line.startswith("llm;") and "invoke" in line for line in lines)
+        assert any(line.startswith("tool;") for line in lines)
+        with open(speedscope_path, encoding="utf-8") as f:
+            speedscope = json.load(f)
+        assert speedscope["profiles"][0]["type"] == "sampled"
+
+
+def test_cprofile_backend_and_sampling_rate():
+    """cProfile 后端导出 .prof；未指定 profile 时按抽样比例决定是否剖析"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with RunProfiler(run_id="run-1", output_dir=tmp, backend="cprofile") as profiler:
+            ScriptedLLM(latency=0.1).invoke([])
+            busy(0.1)
+        assert profiler.report["files"] == [os.path.join(tmp, "run-1.prof")]
+        assert 0.05 < profiler.report["llm_time"] < 0.2
+        assert profiler.report["cpu_time"] > 0.05
+
+    os.environ["AGENT_PROFILE_RATE"] = "0"
+    try:
+        agent = make_agent()
+        agent.run("测试")
+        assert agent.last_profile is None
+    finally:
+        del os.environ["AGENT_PROFILE_RATE"]
+
+
+def test_concurrent_cprofile_runs_do_not_fail():
+    """cProfile 同时只能剖析一个线程，其他并发运行跳过剖析而不是失败"""
+    results, profiles = [], []
+
+    def run_agent():
+        agent = MyReflectionAgent(name="并发", llm=ScriptedLLM(latency=0.2), max_iterations=0)
+        results.append(agent.run("任务", profile=True))
+        profiles.append(agent.last_profile)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(AGENT_PROFILE_DIR=tmp, AGENT_PROFILE_BACKEND="cprofile")
+        try:
+            threads = [threading.Thread(target=run_agent) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del os.environ["AGENT_PROFILE_DIR"], os.environ["AGENT_PROFILE_BACKEND"]
+
+    assert len(results) == 2
+    assert sorted("skipped" in profile for profile in profiles) == [False, True]
+
+
+if __name__ == "__main__":
+    test_profile_attributes_phases_and_exports()
+    test_cprofile_backend_and_sampling_rate()
+    test_concurrent_cprofile_runs_do_not_fail()
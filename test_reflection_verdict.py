@@ -0,0 +1,60 @@
+from fake_llm import ScriptedLLM
+from my_cascade import CascadeLLM
+from my_reflection_agent import MyReflectionAgent, is_good_enough, parse_verdict
+
+
+def test_parse_verdict():
+    """结论解析：允许前后有多余文本，截断的 JSON 退而只取 verdict 字段"""
+    assert parse_verdict('{"verdict": "accept", "issues": []}') == ("accept", [])
+    assert parse_verdict('结论：```json\n{"verdict": "Revise", "issues": ["边界错误"]}\n```') == ("revise", ["边界错误"])
+    assert parse_verdict('{"verdict": "revise", "issues": ["n=0 时') == ("revise", [])
+    assert parse_verdict("无需改进") is None
+    assert is_good_enough("整体 Looks Good")
+
+
+def test_accept_path_uses_single_capped_call():
+    """判定 accept 时只有一次带 max_tokens 上限的结论调用"""
+    llm = ScriptedLLM(["初稿", '{"verdict": "accept", "issues": []}'])
+    agent = MyReflectionAgent(name="反思", llm=llm, reflect_mode="verdict", verdict_max_tokens=64)
+    assert agent.run("任务", temperature=0.2) == "初稿"
+    assert llm.calls == 2
+    assert llm.requests[1][1] == {"temperature": 0.2, "max_tokens": 64}
+
+
+def test_revise_path_requests_feedback():
+    """判定 revise 时请求包含问题列表的修改意见，再据此修改"""
+    llm = ScriptedLLM([
+        "初稿",
+        '{"verdict": "revise", "issues": ["缺少边界处理"]}',
+        "请处理 n=0 的情况",
+        "第二稿",
+        '{"verdict": "accept", "issues": []}',
+    ])
+    agent = MyReflectionAgent(name="反思", llm=llm, reflect_mode="verdict")
+    assert agent.run("任务") == "第二稿"
+    feedback_prompt, feedback_kwargs = llm.requests[2]
+    assert "- 缺少边界处理" in feedback_prompt
+    assert "max_tokens" not in feedback_kwargs
+    assert "请处理 n=0 的情况" in llm.requests[3][0]
+
+
+def test_unparseable_verdict_escalates_in_cascade():
+    """级联模式下小模型的结论无法解析时升级到大模型，而不是按停止短语判断"""
+    small = ScriptedLLM(["我觉得写得不错"])
+    large = ScriptedLLM(['{"verdict": "accept", "issues": []}'])
+    reflect_llm = CascadeLLM(small, large, role="reflect")
+    llm = ScriptedLLM(["初稿"])
+    agent = MyReflectionAgent(name="反思", llm=llm, role_llms={"reflect": reflect_llm}, reflect_mode="verdict")
+
+    assert agent.run("任务") == "初稿"
+    assert small.calls == 1
+    assert large.calls == 1
+    assert large.requests[0][1]["max_tokens"] == 128
+    assert reflect_llm.get_stats()["escalation_reasons"] == {"invalid": 1}
+
+
+if __name__ == "__main__":
+    test_parse_verdict()
+    test_accept_path_uses_single_capped_call()
+    test_revise_path_requests_feedback()
+    test_unparseable_verdict_escalates_in_cascade()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+from fake_llm import ScriptedLLM
+from my_semantic_cache import SemanticAnswerCache
+from my_simple_agent import MySimpleAgent
+
+
+def test_paraphrase_hit():
+    """改写后的问题命中缓存，无关问题不命中"""
+    cache = SemanticAnswerCache(capacity=16, threshold=0.8)
+    cache.put("请介绍一下Python编程语言", "Python是一种编程语言")
+
+    assert cache.get("请介绍一下 Python 编程语言。") == "Python是一种编程语言"
+    assert cache.get("今天天气怎么样") is None
+    assert cache.search("介绍Python", top_k=1)[0][1] == "请介绍一下Python编程语言"
+
+
+def test_entity_swap_misses_and_rewording_hits():
+    """只替换一个实体的问题不命中，真正的改写仍然命中"""
+    cache = SemanticAnswerCache(capacity=16)
+    cache.put("法国的首都是哪里？", "巴黎")
+
+    assert cache.get("德国的首都是哪里？") is None
+    assert cache.get("英国的首都是哪里？") is None
+    assert cache.get("法国的首府是哪里？") is None
+    assert cache.get("请问一下德国的首都是哪个城市") is None
+    assert cache.get("请问法国首都是哪个城市") == "巴黎"
+    assert cache.get("法国的首都是什么") == "巴黎"
+
+    cache.put("What is the capital of France?", "Paris")
+    assert cache.get("What is the capital of Germany?") is None
+
+
+def test_eviction():
+    """容量满时淘汰最久未命中的条目"""
+    cache = SemanticAnswerCache(capacity=2, threshold=0.95)
+    cache.put("第一个问题是什么", "一")
+    cache.put("第二个问题是什么", "二")
+    cache.get("第一个问题是什么")
+    cache.put("完全不同的第三条", "三")
+
+    assert len(cache) == 2
+    assert cache.get("第一个问题是什么") == "一"
+    assert cache.get("第二个问题是什么") is None
+
+
+def test_persistence():
+    """内存映射文件在重新打开后仍然可用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answers")
+        cache = SemanticAnswerCache(path=path, capacity=8)
+        cache.put("什么是人工智能", "AI")
+        cache.flush()
+
+        reopened = SemanticAnswerCache(path=path, capacity=8)
+        assert reopened.get("什么是人工智能？") == "AI"
+
+
+def test_numbers_and_operators_must_match():
+    """只有数字或运算符不同的问题不命中缓存"""
+    cache = SemanticAnswerCache(capacity=8)
+    cache.put("请帮我计算 123 乘以 456 等于多少", "56088")
+
+    assert cache.get("请帮我计算123乘以456等于多少？") == "56088"
+    assert cache.get("请帮我计算 123 乘以 457 等于多少") is None
+    assert cache.get("请帮我计算 124 乘以 456 等于多少") is None
+    assert cache.get("请帮我计算 123 除以 456 等于多少") is None
+
+
+def test_metadata_log_compaction():
+    """覆盖写入不会让元数据日志无限增长，压缩后重新打开内容不变"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answers")
+        cache = SemanticAnswerCache(path=path, capacity=4, compact_factor=2)
+        for i in range(20):
+            cache.put("什么是人工智能", f"AI{i}")
+        with open(f"{path}.jsonl", encoding="utf-8") as f:
+            assert len(f.readlines()) <= 8
+
+        # 写入中断留下的半行被跳过
+        with open(f"{path}.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"slot": 0, "quest')
+        reopened = SemanticAnswerCache(path=path, capacity=4)
+        assert len(reopened) == 1
+        assert reopened.get("什么是人工智能") == "AI19"
+        reopened.put("什么是机器学习", "ML")
+        assert SemanticAnswerCache(path=path, capacity=4).get("什么是机器学习") == "ML"
+
+
+def test_simple_agent_cache():
+    """MySimpleAgent 首轮提问命中缓存时不调用LLM"""
+    cache = SemanticAnswerCache(capacity=8, threshold=0.75)
+    llm = ScriptedLLM(["回答1", "回答2"])
+    first = MySimpleAgent(name="缓存测试", llm=llm, enable_tool_calling=False, answer_cache=cache)
+    second = MySimpleAgent(name="缓存测试", llm=llm, enable_tool_calling=False, answer_cache=cache)
+
+    assert first.run("请解释什么是人工智能") == "回答1"
+    assert second.run("请解释一下什么是人工智能") == "回答1"
+    assert llm.calls == 1
+    assert len(second.get_history()) == 2
+
+    # 系统提示不同的 Agent 不共享缓存的答案
+    other = MySimpleAgent(name="缓存测试", llm=llm, system_prompt="你是一名律师", enable_tool_calling=False, answer_cache=cache)
+    assert other.run("请解释什么是人工智能") == "回答2"
+
+
+if __name__ == "__main__":
+    test_paraphrase_hit()
+    test_entity_swap_misses_and_rewording_hits()
+    test_eviction()
+    test_persistence()
+    test_numbers_and_operators_must_match()
+    test_metadata_log_compaction()
+    test_simple_agent_cache()
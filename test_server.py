@@ -0,0 +1,191 @@
+import asyncio
+import json
+import threading
+import time
+from my_server import AgentServer, LLMPool, StubLLM
+
+
+async def http_request(port: int, method: str, path: str, payload: dict = None):
+    """发送一次 HTTP 请求，返回 (状态码, 响应体文本)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload or {}, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, content.decode("utf-8")
+
+
+class TrackingLLM(StubLLM):
+    """记录同时进行的LLM调用数，流式响应逐字符推送"""
+
+    def __init__(self, latency: float = 0.05):
+        super().__init__(latency)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def invoke(self, messages, **kwargs):
+        self._enter()
+        try:
+            return super().invoke(messages, **kwargs)
+        finally:
+            self._exit()
+
+    def stream_invoke(self, messages, **kwargs):
+        self._enter()
+        try:
+            for char in "stream answer " * 5:
+                time.sleep(self.latency / 10)
+                yield char
+        finally:
+            self._exit()
+
+
+class FailingLLM(StubLLM):
+    """每次调用都抛出异常"""
+
+    def invoke(self, messages, **kwargs):
+        raise RuntimeError("上游不可用")
+
+
+async def with_server(scenario, llm_factory=lambda _: StubLLM(latency=0.05), **server_kwargs):
+    server = AgentServer(LLMPool(llm_factory), **server_kwargs)
+    http_server = await server.start("127.0.0.1", 0)
+    port = http_server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(server, port)
+    finally:
+        http_server.close()
+        await http_server.wait_closed()
+        server.close()
+
+
+def test_run_all_agent_types():
+    """四种 Agent 都能通过 HTTP 运行"""
+    async def scenario(server, port):
+        results = {}
+        for agent_type in ("simple", "react", "plan_and_solve", "reflection"):
+            status, body = await http_request(port, "POST", f"/v1/agents/{agent_type}/run", {"session_id": "s1", "input": "你好"})
+            results[agent_type] = (status, json.loads(body)["output"])
+        return results
+
+    results = asyncio.run(with_server(scenario))
+    assert results["simple"] == (200, "stub answer")
+    assert results["react"] == (200, "stub answer")
+    assert results["plan_and_solve"] == (200, "stub answer")
+    assert results["reflection"] == (200, "stub answer")
+
+
+def test_sse_stream():
+    """stream=true 时以 SSE 推送片段与最终结果"""
+    async def scenario(server, port):
+        return await http_request(port, "POST", "/v1/agents/simple/run", {"input": "你好", "stream": True})
+
+    status, body = asyncio.run(with_server(scenario))
+    assert status == 200
+    assert "event: chunk" in body
+    done = body.split("event: done\ndata: ")[1].strip()
+    assert json.loads(done)["output"] == "stub answer"
+
+
+def test_overload_returns_429():
+    """排队已满时返回 429，同一会话的历史在串行执行后保持完整"""
+    async def scenario(server, port):
+        requests = [
+            http_request(port, "POST", "/v1/agents/simple/run", {"session_id": "same", "input": f"问题{i}"})
+            for i in range(4)
+        ]
+        statuses = [status for status, _ in await asyncio.gather(*requests)]
+        session = server._sessions["same"]
+        return statuses, len(session.agents["simple"].get_history())
+
+    statuses, history_len = asyncio.run(with_server(scenario, max_inflight=1, max_queue=8, session_queue=2))
+    assert statuses.count(200) == 2
+    assert statuses.count(429) == 2
+    assert history_len == 4
+
+
+def test_sse_disconnect_keeps_session_serialized():
+    """SSE 客户端断开后，生成线程结束前同一会话的下一个请求不会开始执行"""
+    llm = TrackingLLM()
+
+    async def scenario(server, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps({"session_id": "s", "input": "你好", "stream": True}).encode("utf-8")
+        writer.write(
+            f"POST /v1/agents/simple/run HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await reader.readuntil(b"event: chunk")
+        writer.transport.abort()
+
+        status, _ = await http_request(port, "POST", "/v1/agents/simple/run", {"session_id": "s", "input": "第二个问题"})
+        return status, server._sessions["s"].agents["simple"].get_history()
+
+    status, history = asyncio.run(with_server(scenario, llm_factory=lambda _: llm))
+    assert status == 200
+    assert llm.max_active == 1
+    # 断开的流式请求不写入历史，只保留第二轮对话
+    assert [message.content for message in history] == ["第二个问题", "stub answer"]
+
+
+def test_bad_content_length_returns_400():
+    """Content-Length 不是整数时返回 400"""
+    async def scenario(server, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /v1/agents/simple/run HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b" ", 2)[1])
+
+    assert asyncio.run(with_server(scenario)) == 400
+
+
+def test_stream_error_after_headers():
+    """SSE 响应头发出后运行失败时推送 error 事件，而不是在事件流中写入 500 响应"""
+    async def scenario(server, port):
+        result = await http_request(port, "POST", "/v1/agents/react/run", {"input": "你好", "stream": True})
+        return result, server.stats["errors"]
+
+    (status, body), errors = asyncio.run(with_server(scenario, llm_factory=lambda _: FailingLLM()))
+    assert status == 200
+    assert "HTTP/1.1" not in body
+    assert json.loads(body.split("event: error\ndata: ")[1].strip())["error"] == "上游不可用"
+    assert "event: done" not in body
+    assert errors == 1
+
+
+def test_oversized_body_returns_413():
+    """Content-Length 超过上限时返回 413，不读取请求体"""
+    async def scenario(server, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /v1/agents/simple/run HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b" ", 2)[1])
+
+    assert asyncio.run(with_server(scenario, max_body_bytes=1024)) == 413
+
+
+if __name__ == "__main__":
+    test_run_all_agent_types()
+    test_sse_stream()
+    test_overload_returns_429()
+    test_sse_disconnect_keeps_session_serialized()
+    test_bad_content_length_returns_400()
+    test_stream_error_after_headers()
+    test_oversized_body_returns_413()
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from fake_llm import ScriptedLLM
+from my_singleflight import CoalescingLLM
+
+
+def answer(messages):
+    return f"答案:{messages[-1]['content']}"
+
+
+def test_thread_coalescing():
+    """多个线程的相同请求只调用一次上游"""
+    upstream = ScriptedLLM([answer], latency=0.2)
+    llm = CoalescingLLM(upstream)
+    messages = [{"role": "user", "content": "问题"}]
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(llm.invoke(messages))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["答案:问题"] * 8
+    assert upstream.calls == 1
+    assert llm.stats["coalesced_calls"] == 7
+
+    # 请求结束后不再复用结果
+    llm.invoke(messages)
+    assert upstream.calls == 2
+
+
+def test_different_requests_not_merged():
+    """参数不同的请求不会合并"""
+    upstream = ScriptedLLM([answer], latency=0.05)
+    llm = CoalescingLLM(upstream)
+    messages = [{"role": "user", "content": "问题"}]
+
+    threads = [
+        threading.Thread(target=llm.invoke, args=(messages,), kwargs={"temperature": t})
+        for t in (0.1, 0.9)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert upstream.calls == 2
+
+
+def test_stream_fan_out():
+    """流式片段分发给所有并发调用方"""
+    upstream = ScriptedLLM([answer], latency=0.2)
+    llm = CoalescingLLM(upstream)
+    messages = [{"role": "user", "content": "问候"}]
+    outputs = []
+
+    def consume():
+        outputs.append("".join(llm.stream_invoke(messages)))
+
+    threads = [threading.Thread(target=consume) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert outputs == ["答案:问候"] * 4
+    assert upstream.stream_calls == 1
+
+
+def test_asyncio_coalescing():
+    """asyncio 模式下的合并与流式分发"""
+    upstream = ScriptedLLM([answer], latency=0.2)
+    llm = CoalescingLLM(upstream)
+    messages = [{"role": "user", "content": "问题"}]
+
+    async def collect_stream():
+        return "".join([chunk async for chunk in llm.astream_invoke(messages)])
+
+    async def main():
+        answers = await asyncio.gather(*[llm.ainvoke(messages) for _ in range(5)])
+        streams = await asyncio.gather(*[collect_stream() for _ in range(3)])
+        return answers, streams
+
+    answers, streams = asyncio.run(main())
+    assert answers == ["答案:问题"] * 5
+    assert streams == ["答案:问题"] * 3
+    assert upstream.calls == 1
+    assert upstream.stream_calls == 1
+
+
+def test_error_propagates():
+    """上游异常传递给所有等待的调用方"""
+    llm = CoalescingLLM(ScriptedLLM([RuntimeError("上游错误")], latency=0.1))
+    errors = []
+
+    def call():
+        try:
+            llm.invoke([{"role": "user", "content": "x"}])
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == ["上游错误"] * 3
+
+
+if __name__ == "__main__":
+    test_thread_coalescing()
+    test_different_requests_not_merged()
+    test_stream_fan_out()
+    test_asyncio_coalescing()
+    test_error_propagates()
@@ -0,0 +1,62 @@
+from hello_agents import ToolRegistry
+from my_react_agent import MyReActAgent
+from my_tool_call_parser import parse_action, parse_tool_calls, parse_tool_parameters, strip_tool_calls
+
+
+def test_parse_and_strip():
+    """解析出的区间可以一次性移除所有调用"""
+    text = "先查询[TOOL_CALL:search:Python]，再计算[TOOL_CALL:calculator:sqrt(16) + 2]。"
+    calls = parse_tool_calls(text)
+
+    assert [(c.name, c.parameters) for c in calls] == [("search", "Python"), ("calculator", "sqrt(16) + 2")]
+    assert text[calls[0].start:calls[0].end] == "[TOOL_CALL:search:Python]"
+    assert strip_tool_calls(text, calls) == "先查询，再计算。"
+
+
+def test_nested_brackets_and_quotes():
+    """参数中的嵌套括号与引号内的 ']' 不会提前结束调用"""
+    text = '[TOOL_CALL:python:code="print([1, 2][0])"] 和 [TOOL_CALL:search:query="a]b"]'
+    calls = parse_tool_calls(text)
+
+    assert calls[0].parameters == 'code="print([1, 2][0])"'
+    assert calls[1].parameters == 'query="a]b"'
+
+
+def test_unclosed_quote_falls_back():
+    """未闭合的撇号不会吞掉后续内容"""
+    calls = parse_tool_calls("[TOOL_CALL:search:don't panic] 之后")
+    assert calls[0].parameters == "don't panic"
+
+    text = "[TOOL_CALL:search:don't panic] then [TOOL_CALL:search:won't stop]"
+    calls = parse_tool_calls(text)
+    assert [c.parameters for c in calls] == ["don't panic", "won't stop"]
+    assert strip_tool_calls(text, calls) == " then "
+
+
+def test_multi_pair_parameters():
+    """多个 key=value 分别解析，引号内的逗号保留"""
+    params = parse_tool_parameters("memory", 'action=add, content="苹果, 香蕉", importance=0.8')
+    assert params == {"action": "add", "content": "苹果, 香蕉", "importance": "0.8"}
+
+    assert parse_tool_parameters("memory", "recall=用户信息") == {"recall": "用户信息"}
+    assert parse_tool_parameters("search", "Python编程") == {"query": "Python编程"}
+
+
+def test_react_action():
+    """ReAct 行动与 TOOL_CALL 共用配对扫描"""
+    call = parse_action("calculator[(1 + 2) * [3]] 然后结束")
+    assert (call.name, call.parameters) == ("calculator", "(1 + 2) * [3]")
+    assert parse_action("没有行动") is None
+
+    agent = MyReActAgent(name="解析测试", llm=None, tool_registry=ToolRegistry())
+    assert agent._parse_action_input("Finish[答案是 [42]]") == "答案是 [42]"
+    # 括号不配对时以最后一个 ']' 结束
+    assert agent._parse_action_input("Finish[区间为 [1, 2)]") == "区间为 [1, 2)"
+
+
+if __name__ == "__main__":
+    test_parse_and_strip()
+    test_nested_brackets_and_quotes()
+    test_unclosed_quote_falls_back()
+    test_multi_pair_parameters()
+    test_react_action()
@@ -0,0 +1,72 @@
+from hello_agents import ToolRegistry
+from my_simple_agent import MySimpleAgent
+from my_tool_registry import ToolDescriptionCache, VersionedToolRegistry, rank_tools
+
+
+def build_registry(registry_cls=VersionedToolRegistry):
+    registry = registry_cls()
+    registry.register_function("calculator", "数学计算工具，支持加减乘除", lambda x: x)
+    registry.register_function("weather", "查询城市天气预报", lambda x: x)
+    registry.register_function("translate", "中英文翻译工具", lambda x: x)
+    return registry
+
+
+def test_version_bumps():
+    """注册和注销工具时版本号递增"""
+    registry = build_registry()
+    assert registry.version == 3
+    registry.unregister("weather")
+    assert registry.version == 4
+
+
+def test_prompt_cached_until_registry_changes():
+    """注册表不变时复用渲染好的系统提示，增删工具后重新渲染"""
+    registry = build_registry()
+    agent = MySimpleAgent(name="缓存测试", llm=None, tool_registry=registry)
+
+    first = agent._get_enhanced_system_prompt("你好")
+    assert agent._get_enhanced_system_prompt("你好") is first
+
+    agent.remove_tool("weather")
+    second = agent._get_enhanced_system_prompt("你好")
+    assert "weather" in first
+    assert "weather" not in second
+
+
+def test_plain_registry_invalidation():
+    """普通 ToolRegistry 通过工具名称列表检测变化"""
+    registry = build_registry(ToolRegistry)
+    cache = ToolDescriptionCache()
+    assert "translate" in cache.describe(registry)
+    registry.unregister("translate")
+    assert "translate" not in cache.describe(registry)
+
+
+def test_top_k_descriptions():
+    """紧凑模式只保留与输入最相关的工具"""
+    registry = build_registry()
+    agent = MySimpleAgent(name="紧凑测试", llm=None, tool_registry=registry, tool_description_top_k=1)
+
+    prompt = agent._get_enhanced_system_prompt("明天北京天气怎么样")
+    assert "weather" in prompt
+    assert "calculator" not in prompt
+
+    # 工具描述的词项只在注册表变化时重新提取
+    cache = ToolDescriptionCache()
+    assert "weather" in cache.describe(registry, "明天北京天气怎么样", 1)
+    term_sets = cache._term_sets
+    assert "calculator" in cache.describe(registry, "帮我计算加减乘除", 1)
+    assert cache._term_sets is term_sets
+    registry.register_function("search", "网页搜索", lambda x: x)
+    assert "search" in cache.describe(registry, "搜索一下", 1)
+    assert cache._term_sets is not term_sets
+
+    entries = [(name, f"- {name}") for name in ("a", "b", "calculator")]
+    assert rank_tools(entries, "用calculator算一下", 1) == [("calculator", "- calculator")]
+
+
+if __name__ == "__main__":
+    test_version_bumps()
+    test_prompt_cached_until_registry_changes()
+    test_plain_registry_invalidation()
+    test_top_k_descriptions()